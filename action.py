@@ -61,7 +61,15 @@ async def execute_tool(session: ClientSession, tools: list[Any], response: str)
     """Executes a FUNCTION_CALL via MCP tool session."""
     try:
         tool_name, arguments = parse_function_call(response)
+    except Exception as e:
+        log("tool", f"⚠️ Execution failed for '{response}': {e}")
+        raise
+    return await call_tool(session, tools, tool_name, arguments)
 
+
+async def call_tool(session: ClientSession, tools: list[Any], tool_name: str, arguments: Dict[str, Any]) -> ToolCallResult:
+    """Calls an MCP tool by name and collects its output and sources."""
+    try:
         tool = next((t for t in tools if t.name == tool_name), None)
         if not tool:
             raise ValueError(f"Tool '{tool_name}' not found in registered tools")
@@ -112,5 +120,5 @@ async def execute_tool(session: ClientSession, tools: list[Any], response: str)
         )
 
     except Exception as e:
-        log("tool", f"⚠️ Execution failed for '{response}': {e}")
+        log("tool", f"⚠️ Execution failed for '{tool_name}' with {arguments}: {e}")
         raise
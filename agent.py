@@ -2,12 +2,15 @@ import asyncio
 import time
 import os
 import datetime
-from perception import extract_perception
+from typing import Any, NamedTuple, Optional
+from perception import extract_perception_async, _rule_based_intent
 from memory import MemoryManager, MemoryItem
-from decision import generate_plan
-from action import execute_tool
-from mcp import ClientSession, StdioServerParameters
+from decision import generate_plan_async, synthesize_answer_async
+from action import ToolCallResult, execute_tool, call_tool, parse_function_call
+from babycare_rag.bm25 import tokenize
+from mcp import ClientSession
 from mcp.client.stdio import stdio_client
+from mcp_pool import MCPSessionPool, default_server_params
  # use this to connect to running server
 
 import shutil
@@ -22,166 +25,325 @@ def log(stage: str, msg: str):
 
 max_steps = 3
 
-async def main(user_input: str):
+# Answer returned when the planner's LLM call fails
+UNKNOWN_ANSWER = "[unknown]"
+UNAVAILABLE_ANSWER = "Apologies, I'm unable to respond at this moment. Please try again later."
+
+
+class AgentAnswer(NamedTuple):
+    """Final answer of an agent run.
+
+    ``answered`` is False when the agent failed (LLM or tool errors, no
+    session) or gave up without an answer, so callers can tell a real answer
+    from a fallback message.
+    """
+    text: str
+    answered: bool
+
+# Intents answered by one search and one LLM call, without the planning loop
+FAST_PATH_INTENTS = {"factoid", "advice", "numerical_range"}
+
+# Share of a planned search's tokens that must occur in the prefetched
+# question for the prefetched results to be used
+PREFETCH_OVERLAP = 0.8
+
+# Robust temperature detection (68–72°F, optionally with 20–22°C)
+TEMP_PATTERN = r"((?:6\s*8)\s*(?:-|–|~|to)\s*(?:7\s*2)\s*(?:°\s*)?F)(?:\s*(?:\(|\s)\s*((?:2\s*0)\s*(?:-|–|~|to)\s*(?:2\s*2)\s*(?:°\s*)?C)\)?)?"
+
+# Questions the temperature range shortcut may answer
+TEMP_QUESTION = r"temperature|celsius|fahrenheit|\bdegrees?\b|°"
+
+
+async def answer_directly(session: ClientSession, tools: list[Any], user_input: str,
+                          retrievals: Optional[list[str]] = None) -> Optional[str]:
+    """Retrieve-then-answer: search_documents for the question, then one LLM synthesis call.
+
+    Returns None when the search or the LLM call fails, so the caller can
+    fall back to the planning loop.
+    """
+    try:
+        result = await call_tool(session, tools, "search_documents", {"query": user_input})
+    except Exception as e:
+        log("fast", f"Search failed, falling back to planning: {e}")
+        return None
+
+    snippets = result.result if isinstance(result.result, list) else [str(result.result)]
+    if not snippets or any(str(s).startswith("ERROR:") for s in snippets):
+        log("fast", "No usable search results, falling back to planning")
+        return None
+
+    # Snippets are recorded only with an answer; on fallback the planning loop records its own
+    if re.search(TEMP_QUESTION, user_input, flags=re.IGNORECASE):
+        match = re.search(TEMP_PATTERN, "\n".join(snippets), flags=re.IGNORECASE)
+        if match:
+            log("agent", f"✅ TEMPERATURE FOUND: {match.group(0)}")
+            if retrievals is not None:
+                retrievals.extend(snippets)
+            return match.group(0)
+
+    answer = await synthesize_answer_async(user_input, snippets)
+    if answer is not None and retrievals is not None:
+        retrievals.extend(snippets)
+    return answer
+
+
+def _similar_query(planned: str, prefetched: str) -> bool:
+    # Planned searches usually keep the key terms of the question and drop the rest
+    planned_tokens, prefetched_tokens = set(tokenize(planned)), set(tokenize(prefetched))
+    if not planned_tokens:
+        return False
+    return len(planned_tokens & prefetched_tokens) / len(planned_tokens) >= PREFETCH_OVERLAP
+
+
+def _ignore_result(task: asyncio.Task):
+    # A discarded prefetch may still fail; mark its exception as retrieved
+    if not task.cancelled():
+        task.exception()
+
+
+async def use_prefetch(prefetch: asyncio.Task, prefetch_query: str, plan: str) -> Optional[ToolCallResult]:
+    """The prefetched search result if the plan searches for the same or a similar query."""
+    try:
+        tool_name, arguments = parse_function_call(plan)
+    except Exception:
+        prefetch.cancel()
+        return None
+    query = arguments.get("query")
+    if tool_name != "search_documents" or not isinstance(query, str) \
+            or not _similar_query(query, prefetch_query):
+        log("prefetch", "Plan does not match the prefetched search, discarding it")
+        prefetch.cancel()
+        return None
+    try:
+        result = await prefetch
+    except Exception as e:
+        log("prefetch", f"Prefetched search failed: {e}")
+        return None
+    log("prefetch", "Using prefetched search results")
+    return result
+
+
+async def run_agent_loop(session: ClientSession, tools: list[Any], user_input: str,
+                         retrievals: Optional[list[str]] = None) -> AgentAnswer:
+    """Run the perception → plan → action loop on an initialized MCP session.
+
+    When ``retrievals`` is given, the snippets returned by every
+    search_documents call are appended to it, so callers can reuse them
+    instead of searching again.
+    """
+    tool_descriptions = "\n".join(
+        f"- {tool.name}: {getattr(tool, 'description', 'No description')}"
+        for tool in tools
+    )
+
+    log("agent", f"{len(tools)} tools loaded")
+
+    intent = _rule_based_intent(user_input)
+    if intent in FAST_PATH_INTENTS and any(tool.name == "search_documents" for tool in tools):
+        log("fast", f"Intent: {intent}, answering directly from search results")
+        answer = await answer_directly(session, tools, user_input, retrievals)
+        if answer is not None:
+            log("agent", f"✅ FINAL RESULT: {answer}")
+            return AgentAnswer(answer, answered=True)
+
+    memory = MemoryManager()
+    session_id = f"session-{int(time.time())}"
+    query = user_input
+    step = 0
+    final_answer = "No response generated."
+    answered = False
+
+    # Speculatively search for the raw question while perception and planning run
+    prefetch: Optional[asyncio.Task] = None
+    if intent not in FAST_PATH_INTENTS and any(tool.name == "search_documents" for tool in tools):
+        prefetch = asyncio.create_task(call_tool(session, tools, "search_documents", {"query": user_input}))
+        prefetch.add_done_callback(_ignore_result)
+
+    try:
+        while step < max_steps:
+            log("loop", f"Step {step + 1} started")
+
+            perception = await extract_perception_async(user_input)
+            log("perception", f"Intent: {perception.intent}, Tool hint: {perception.tool_hint}")
+
+            # Memory embeddings are blocking HTTP calls; keep them off the event loop
+            retrieved = await asyncio.to_thread(memory.retrieve, query=user_input, top_k=3, session_filter=session_id)
+            log("memory", f"Retrieved {len(retrieved)} relevant memories")
+
+            plan = await generate_plan_async(perception, retrieved, tool_descriptions=tool_descriptions)
+            log("plan", f"Plan generated: {plan}")
+
+            if plan is None:
+                final_answer = UNKNOWN_ANSWER
+                break
+
+            if plan.startswith("FINAL_ANSWER:"):
+                log("agent", f"✅ FINAL RESULT: {plan}")
+                final_answer = plan.replace("FINAL_ANSWER:", "").strip()
+                answered = True
+                break
+
+            # Also check if the plan contains a final answer without the prefix
+            # Robust temperature detection in plan text
+            if re.search(TEMP_PATTERN, plan, flags=re.IGNORECASE):
+                log("agent", f"✅ TEMPERATURE ANSWER FOUND: {plan}")
+                final_answer = plan.strip()
+                answered = True
+                break
+
+            try:
+                result = None
+                if prefetch is not None:
+                    # Only the first tool call can use the prefetch
+                    result = await use_prefetch(prefetch, query, plan)
+                    prefetch = None
+                if result is None:
+                    result = await execute_tool(session, tools, plan)
+                log("tool", f"{result.tool_name} returned result (length: {len(str(result.result))})")
+
+                # Store search results and let LLM generate final answer
+                await asyncio.to_thread(memory.add, MemoryItem(
+                    text=f"Tool call: {result.tool_name} with {result.arguments}, got: {result.result}",
+                    type="tool_output",
+                    tool_name=result.tool_name,
+                    user_query=query,
+                    tags=[result.tool_name],
+                    session_id=session_id
+                ))
+
+                # For search_documents, check if we have a direct answer
+                if result.tool_name == "search_documents":
+                    if retrievals is not None:
+                        retrievals.extend(result.result if isinstance(result.result, list) else [str(result.result)])
+
+                    # Check if search results contain temperature information
+                    result_text = str(result.result)
+                    # Robust temperature detection in tool output
+                    if re.search(TEMP_PATTERN, result_text, flags=re.IGNORECASE):
+                        match = re.search(TEMP_PATTERN, result_text, flags=re.IGNORECASE)
+                        final_answer = match.group(0) if match else result_text
+                        answered = True
+                        log("agent", f"✅ TEMPERATURE FOUND: {final_answer}")
+                        break
+
+                    # If this is the last step, try to generate a final answer from search results
+                    if step == max_steps - 1:
+                        log("agent", "Last step reached, generating final answer from search results")
+                        # Try to extract any useful information from search results
+                        if result.result and len(str(result.result)) > 50:
+                            # Use the search results to generate a final answer
+                            user_input = f"Original question: {query}\nSearch results: {result.result}\nBased on the search results above, provide a concise and direct answer to the original question. If no relevant information is found, say 'I could not find specific information about this topic in the available documents.'"
+                        else:
+                            final_answer = "I could not find specific information about this topic in the available documents."
+                            break
+                    else:
+                        user_input = f"Original question: {query}\nSearch results: {result.result}\nBased on the search results above, provide a concise and direct answer to the original question."
+                else:
+                    # For other tools, continue with original logic
+                    sources_suffix = ""
+                    try:
+                        if getattr(result, 'sources', None):
+                            unique_sources = "; ".join(result.sources)
+                            sources_suffix = f"\nSources: {unique_sources}"
+                    except Exception:
+                        pass
+                    user_input = f"Original task: {query}\nPrevious output: {result.result}{sources_suffix}\nWhat should I do next?"
+
+
+
+            except Exception as e:
+                log("error", f"Tool execution failed: {e}")
+                final_answer = UNAVAILABLE_ANSWER
+                break
+
+            step += 1
+    finally:
+        # The prefetch is unused if the loop ended before the first tool call
+        if prefetch is not None:
+            prefetch.cancel()
+
+    # If we've reached max_steps without a final answer, try one more time to generate an answer
+    if step >= max_steps and final_answer == "No response generated.":
+        log("agent", "Max steps reached, attempting final answer generation")
+        # Get the last memory items to see if we have any useful information
+        recent_memories = await asyncio.to_thread(memory.retrieve, query=query, top_k=5, session_filter=session_id)
+        if recent_memories:
+            # Try to generate a final answer based on available information
+            final_perception = await extract_perception_async(query)
+            final_plan = await generate_plan_async(final_perception, recent_memories, tool_descriptions=tool_descriptions)
+            if final_plan is not None and final_plan.startswith("FINAL_ANSWER:"):
+                final_answer = final_plan.replace("FINAL_ANSWER:", "").strip()
+                answered = True
+                log("agent", f"✅ FINAL ANSWER GENERATED: {final_answer}")
+            else:
+                final_answer = "I was unable to find a complete answer to your question based on the available information."
+                log("agent", f"Using fallback answer: {final_answer}")
+        else:
+            final_answer = "I was unable to find relevant information to answer your question."
+            log("agent", f"No memories found, using fallback: {final_answer}")
+
+    return AgentAnswer(final_answer, answered)
+
+async def main(user_input: str, pool: Optional[MCPSessionPool] = None,
+               retrievals: Optional[list[str]] = None) -> str:
+    return (await run(user_input, pool=pool, retrievals=retrievals)).text
+
+
+async def run(user_input: str, pool: Optional[MCPSessionPool] = None,
+              retrievals: Optional[list[str]] = None) -> AgentAnswer:
+    """Like main, but also reports whether the agent actually answered."""
+    unavailable = AgentAnswer(UNAVAILABLE_ANSWER, answered=False)
+    final_answer = unavailable
     try:
         print("[agent] Starting agent...")
         print(f"[agent] Current working directory: {os.getcwd()}")
 
-        server_params = StdioServerParameters(
-            command="python",
-            args=["math_mcp_embeddings.py"],
-            cwd=str(Path(__file__).parent.resolve())
-        )
-
-        try:
-            async with stdio_client(server_params) as (read, write):
-                print("Connection established, creating session...")
-                try:
-                    async with ClientSession(read, write) as session:
-                        print("[agent] Session created, initializing...")
-
-                        try:
-                            await session.initialize()
-                            print("[agent] MCP session initialized")
-
-                            # Your reasoning, planning, perception etc. would go here
-                            tools = await session.list_tools()
-                            print("Available tools:", [t.name for t in tools.tools])
-
-                            # Get available tools
-                            print("Requesting tool list...")
-                            tools_result = await session.list_tools()
-                            tools = tools_result.tools
-                            tool_descriptions = "\n".join(
-                                f"- {tool.name}: {getattr(tool, 'description', 'No description')}"
-                                for tool in tools
-                            )
-
-                            log("agent", f"{len(tools)} tools loaded")
-
-                            memory = MemoryManager()
-                            session_id = f"session-{int(time.time())}"
-                            query = user_input
-                            step = 0
-                            final_answer = "No response generated."
-
-                            while step < max_steps:
-                                log("loop", f"Step {step + 1} started")
-
-                                perception = extract_perception(user_input)
-                                log("perception", f"Intent: {perception.intent}, Tool hint: {perception.tool_hint}")
-
-                                retrieved = memory.retrieve(query=user_input, top_k=3, session_filter=session_id)
-                                log("memory", f"Retrieved {len(retrieved)} relevant memories")
-
-                                plan = generate_plan(perception, retrieved, tool_descriptions=tool_descriptions)
-                                log("plan", f"Plan generated: {plan}")
-
-                                if plan.startswith("FINAL_ANSWER:"):
-                                    log("agent", f"✅ FINAL RESULT: {plan}")
-                                    final_answer = plan.replace("FINAL_ANSWER:", "").strip()
-                                    break
-
-                                # Also check if the plan contains a final answer without the prefix
-                                # Robust temperature detection in plan text
-                                temp_pattern = r"((?:6\s*8)\s*(?:-|–|~|to)\s*(?:7\s*2)\s*(?:°\s*)?F)(?:\s*(?:\(|\s)\s*((?:2\s*0)\s*(?:-|–|~|to)\s*(?:2\s*2)\s*(?:°\s*)?C)\)?)?"
-                                if re.search(temp_pattern, plan, flags=re.IGNORECASE):
-                                    log("agent", f"✅ TEMPERATURE ANSWER FOUND: {plan}")
-                                    final_answer = plan.strip()
-                                    break
-
-                                try:
-                                    result = await execute_tool(session, tools, plan)
-                                    log("tool", f"{result.tool_name} returned result (length: {len(str(result.result))})")
-
-                                    # Store search results and let LLM generate final answer
-                                    memory.add(MemoryItem(
-                                        text=f"Tool call: {result.tool_name} with {result.arguments}, got: {result.result}",
-                                        type="tool_output",
-                                        tool_name=result.tool_name,
-                                        user_query=query,
-                                        tags=[result.tool_name],
-                                        session_id=session_id
-                                    ))
-
-                                    # For search_documents, check if we have a direct answer
-                                    if result.tool_name == "search_documents":
-                                        # Check if search results contain temperature information
-                                        result_text = str(result.result)
-                                        # Robust temperature detection in tool output
-                                        temp_pattern = r"((?:6\s*8)\s*(?:-|–|~|to)\s*(?:7\s*2)\s*(?:°\s*)?F)(?:\s*(?:\(|\s)\s*((?:2\s*0)\s*(?:-|–|~|to)\s*(?:2\s*2)\s*(?:°\s*)?C)\)?)?"
-                                        if re.search(temp_pattern, result_text, flags=re.IGNORECASE):
-                                            match = re.search(temp_pattern, result_text, flags=re.IGNORECASE)
-                                            final_answer = match.group(0) if match else result_text
-                                            log("agent", f"✅ TEMPERATURE FOUND: {final_answer}")
-                                            break
-
-                                        # If this is the last step, try to generate a final answer from search results
-                                        if step == max_steps - 1:
-                                            log("agent", "Last step reached, generating final answer from search results")
-                                            # Try to extract any useful information from search results
-                                            if result.result and len(str(result.result)) > 50:
-                                                # Use the search results to generate a final answer
-                                                user_input = f"Original question: {query}\nSearch results: {result.result}\nBased on the search results above, provide a concise and direct answer to the original question. If no relevant information is found, say 'I could not find specific information about this topic in the available documents.'"
-                                            else:
-                                                final_answer = "I could not find specific information about this topic in the available documents."
-                                                break
-                                        else:
-                                            user_input = f"Original question: {query}\nSearch results: {result.result}\nBased on the search results above, provide a concise and direct answer to the original question."
-                                    else:
-                                        # For other tools, continue with original logic
-                                        sources_suffix = ""
-                                        try:
-                                            if getattr(result, 'sources', None):
-                                                unique_sources = "; ".join(result.sources)
-                                                sources_suffix = f"\nSources: {unique_sources}"
-                                        except Exception:
-                                            pass
-                                        user_input = f"Original task: {query}\nPrevious output: {result.result}{sources_suffix}\nWhat should I do next?"
-
-
-
-                                except Exception as e:
-                                    log("error", f"Tool execution failed: {e}")
-                                    final_answer = f"Apologies, I'm unable to respond at this moment. Please try again later."
-                                    break
-
-                                step += 1
-
-                            # If we've reached max_steps without a final answer, try one more time to generate an answer
-                            if step >= max_steps and final_answer == "No response generated.":
-                                log("agent", "Max steps reached, attempting final answer generation")
-                                # Get the last memory items to see if we have any useful information
-                                recent_memories = memory.retrieve(query=query, top_k=5, session_filter=session_id)
-                                if recent_memories:
-                                    # Try to generate a final answer based on available information
-                                    final_perception = extract_perception(query)
-                                    final_plan = generate_plan(final_perception, recent_memories, tool_descriptions=tool_descriptions)
-                                    if final_plan.startswith("FINAL_ANSWER:"):
-                                        final_answer = final_plan.replace("FINAL_ANSWER:", "").strip()
-                                        log("agent", f"✅ FINAL ANSWER GENERATED: {final_answer}")
-                                    else:
-                                        final_answer = "I was unable to find a complete answer to your question based on the available information."
-                                        log("agent", f"Using fallback answer: {final_answer}")
-                                else:
-                                    final_answer = "I was unable to find relevant information to answer your question."
-                                    log("agent", f"No memories found, using fallback: {final_answer}")
-                        except Exception as e:
-                            print(f"[agent] Session initialization error: {str(e)}")
-                            final_answer = f"Apologies, I'm unable to respond at this moment. Please try again later."
-                except Exception as e:
-                    print(f"[agent] Session creation error: {str(e)}")
-                    final_answer = f"Apologies, I'm unable to respond at this moment. Please try again later."
-        except Exception as e:
-            print(f"[agent] Connection error: {str(e)}")
-            final_answer = f"Apologies, I'm unable to respond at this moment. Please try again later."
+        if pool is not None:
+            # Borrow a warm, already-initialized session
+            try:
+                async with pool.session() as pooled:
+                    final_answer = await run_agent_loop(pooled.session, pooled.tools, user_input, retrievals)
+            except Exception as e:
+                print(f"[agent] Pooled session error: {str(e)}")
+                final_answer = unavailable
+        else:
+            server_params = default_server_params()
+
+            try:
+                async with stdio_client(server_params) as (read, write):
+                    print("Connection established, creating session...")
+                    try:
+                        async with ClientSession(read, write) as session:
+                            print("[agent] Session created, initializing...")
+
+                            try:
+                                await session.initialize()
+                                print("[agent] MCP session initialized")
+
+                                # Get available tools
+                                print("Requesting tool list...")
+                                tools_result = await session.list_tools()
+                                tools = tools_result.tools
+                                print("Available tools:", [t.name for t in tools])
+
+                                final_answer = await run_agent_loop(session, tools, user_input, retrievals)
+                            except Exception as e:
+                                print(f"[agent] Session initialization error: {str(e)}")
+                                final_answer = unavailable
+                    except Exception as e:
+                        print(f"[agent] Session creation error: {str(e)}")
+                        final_answer = unavailable
+            except Exception as e:
+                print(f"[agent] Connection error: {str(e)}")
+                final_answer = unavailable
     except Exception as e:
         print(f"[agent] Overall error: {str(e)}")
-        final_answer = f"Apologies, I'm unable to respond at this moment. Please try again later."
+        final_answer = unavailable
 
     log("agent", "========== Agent session complete. ==========")
     return final_answer
 
+
 if __name__ == "__main__":
     query = input("🧑 What do you want to solve today? → ")
     asyncio.run(main(query))
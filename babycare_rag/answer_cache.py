@@ -0,0 +1,165 @@
+"""Semantic answer cache for BabyCare RAG system."""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import faiss
+import numpy as np
+
+from .embeddings import normalize
+from .models import RAGResponse
+
+# Neighbours checked per lookup, in case the nearest was removed by another process
+_CANDIDATES = 4
+
+# Bumped when the answers table changes shape; older tables are recreated
+_SCHEMA_VERSION = 2
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_BATCH = 500
+
+
+class AnswerCache:
+    """Responses to past questions, looked up by question embedding.
+
+    A question whose embedding has cosine similarity of at least
+    ``threshold`` with a cached question gets the cached response. Entries
+    live in SQLite, so they survive restarts and are shared between
+    processes; their unit vectors are kept in a small in-memory FAISS
+    inner-product index that picks up rows added by other processes on each
+    call. Entries expire ``ttl_seconds`` after they were stored, the least
+    recently used are evicted beyond ``max_entries``, and entries from an
+    older knowledge-base ``generation`` or another embedding ``model`` are
+    dropped. Entries from a newer generation are left alone: they belong to a
+    caller that has already seen the newer knowledge base.
+    """
+
+    def __init__(self, path: Path, model: str, threshold: float = 0.95, ttl_seconds: float = 86400.0,
+                 max_entries: int = 1000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS answers")
+                self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " question TEXT NOT NULL,"
+                " generation INTEGER NOT NULL,"
+                " model TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " response TEXT NOT NULL)"
+            )
+        self._index: Optional[faiss.IndexIDMap2] = None
+        self._loaded_id = 0
+
+    def _remove(self, ids: List[int]):
+        if ids and self._index is not None:
+            self._index.remove_ids(np.array(ids, dtype=np.int64))
+
+    def _delete(self, ids: List[int]):
+        """Delete entries from the table and the in-memory index."""
+        for start in range(0, len(ids), _QUERY_BATCH):
+            batch = ids[start:start + _QUERY_BATCH]
+            self._conn.execute(f"DELETE FROM answers WHERE id IN ({', '.join('?' * len(batch))})", batch)
+        self._remove(ids)
+
+    def _sync(self, generation: int):
+        """Drop stale entries and load rows added since the last call.
+
+        Only rows from generations older than ``generation`` are stale; a
+        caller that is behind must not delete answers for a newer knowledge base.
+        """
+        cutoff = time.time() - self.ttl_seconds
+        stale = [row["id"] for row in self._conn.execute(
+            "SELECT id FROM answers WHERE generation < ? OR model != ? OR created < ?",
+            (generation, self.model, cutoff)
+        )]
+        self._delete(stale)
+
+        rows = self._conn.execute(
+            "SELECT id, vector FROM answers WHERE id > ? ORDER BY id", (self._loaded_id,)
+        ).fetchall()
+        if rows:
+            vectors = np.vstack([np.frombuffer(row["vector"], dtype=np.float32) for row in rows])
+            if self._index is None or self._index.d != vectors.shape[1]:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+            self._index.add_with_ids(vectors, np.array([row["id"] for row in rows], dtype=np.int64))
+            self._loaded_id = rows[-1]["id"]
+
+    def get(self, vector: np.ndarray, generation: int) -> Optional[RAGResponse]:
+        """Cached response for the most similar question above the threshold.
+
+        Only answers computed for ``generation`` itself are returned.
+        """
+        query = normalize(np.asarray(vector, dtype=np.float32).reshape(1, -1))
+        with self._lock, self._conn:
+            self._sync(generation)
+            if self._index is None or self._index.ntotal == 0 or self._index.d != query.shape[1]:
+                return None
+
+            scores, ids = self._index.search(query, min(_CANDIDATES, self._index.ntotal))
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id < 0 or score < self.threshold:
+                    break
+                row = self._conn.execute(
+                    "SELECT generation, response FROM answers WHERE id = ?", (int(entry_id),)
+                ).fetchone()
+                if row is None:
+                    # Evicted by another process
+                    self._remove([int(entry_id)])
+                    continue
+                if row["generation"] != generation:
+                    continue
+                self._conn.execute(
+                    "UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), int(entry_id))
+                )
+                return RAGResponse.model_validate_json(row["response"])
+        return None
+
+    def put(self, question: str, vector: np.ndarray, response: RAGResponse, generation: int):
+        """Store a response, evicting the least recently used entries beyond max_entries."""
+        vector = normalize(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        now = time.time()
+        with self._lock, self._conn:
+            self._sync(generation)
+            self._conn.execute(
+                "INSERT INTO answers (question, generation, model, created, last_used, vector, response) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (question, generation, self.model, now, now, vector.tobytes(), response.model_dump_json())
+            )
+            self._sync(generation)
+
+            over = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_entries
+            if over > 0:
+                evicted = [row["id"] for row in self._conn.execute(
+                    "SELECT id FROM answers ORDER BY last_used LIMIT ?", (over,)
+                )]
+                self._delete(evicted)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM answers")
+            self._index = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
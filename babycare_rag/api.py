@@ -49,6 +49,63 @@ class BabyCareRAGAPI:
                 "traceback": traceback.format_exc()
             }
     
+    async def aquery(self, question: str, **kwargs) -> Dict[str, Any]:
+        """
+        Async version of query, for callers already running an event loop.
+        
+        Args:
+            question: The user's question
+            **kwargs: Additional parameters (max_steps, session_id, etc.)
+        
+        Returns:
+            Dictionary containing the response
+        """
+        try:
+            request = QueryRequest(question=question, **kwargs)
+            response = await self.rag.aprocess_request(request)
+            
+            return {
+                "success": True,
+                "data": response.model_dump(),
+                "error": None
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "data": None,
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            }
+    
+    async def aquery_many(self, questions: List[str], concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Answer several questions concurrently.
+        
+        Args:
+            questions: The user's questions
+            concurrency: Maximum questions in flight (default: MCP pool size)
+        
+        Returns:
+            Dictionary with one response per question, in input order
+        """
+        try:
+            responses = await self.rag.aquery_many(questions, concurrency=concurrency)
+            
+            return {
+                "success": True,
+                "data": [response.model_dump() for response in responses],
+                "error": None
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "data": None,
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            }
+    
     def add_document(self, **kwargs) -> Dict[str, Any]:
         """
         Add a document to the knowledge base.
@@ -77,6 +134,59 @@ class BabyCareRAGAPI:
                 "traceback": traceback.format_exc()
             }
     
+    def add_documents(self, file_paths: List[str]) -> Dict[str, Any]:
+        """
+        Add several documents from file paths with a single index update.
+        
+        Returns:
+            Dictionary with one result per file (success, doc_id, error)
+        """
+        try:
+            results = self.rag.add_documents(file_paths)
+            failed = sum(not result.success for result in results)
+            
+            return {
+                "success": failed == 0,
+                "data": {"results": [result.model_dump() for result in results]},
+                "error": None if failed == 0 else f"{failed} of {len(results)} documents failed"
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "data": None,
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            }
+    
+    def add_texts(self, texts: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Add several text documents with a single index update.
+        
+        Args:
+            texts: Items with "text" and "title" keys
+        
+        Returns:
+            Dictionary with one result per item (success, doc_id, error)
+        """
+        try:
+            results = self.rag.add_texts(texts)
+            failed = sum(not result.success for result in results)
+            
+            return {
+                "success": failed == 0,
+                "data": {"results": [result.model_dump() for result in results]},
+                "error": None if failed == 0 else f"{failed} of {len(results)} documents failed"
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "data": None,
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            }
+    
     def list_documents(self) -> Dict[str, Any]:
         """List all documents in the knowledge base."""
         try:
@@ -134,6 +244,25 @@ class BabyCareRAGAPI:
                 "traceback": traceback.format_exc()
             }
     
+    async def asearch_documents(self, query: str, top_k: int = 5) -> Dict[str, Any]:
+        """Search documents without blocking the event loop."""
+        try:
+            results = await self.rag.asearch_documents(query, top_k)
+            
+            return {
+                "success": True,
+                "data": [result.model_dump() for result in results],
+                "error": None
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "data": None,
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            }
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get system statistics."""
         try:
@@ -153,14 +282,16 @@ class BabyCareRAGAPI:
                 "traceback": traceback.format_exc()
             }
     
-    def rebuild_index(self) -> Dict[str, Any]:
-        """Rebuild the search index."""
+    def rebuild_index(self, background: bool = False) -> Dict[str, Any]:
+        """Rebuild the search index (optionally in the background)."""
         try:
-            success = self.rag.rebuild_index()
+            success = self.rag.rebuild_index(background=background)
             
+            # A background rebuild has only been scheduled at this point
+            data = {"scheduled": success} if background else {"rebuilt": success}
             return {
                 "success": success,
-                "data": {"rebuilt": success},
+                "data": {**data, "background": background},
                 "error": None if success else "Failed to rebuild index"
             }
             
@@ -172,6 +303,25 @@ class BabyCareRAGAPI:
                 "traceback": traceback.format_exc()
             }
     
+    def ingest_directory(self, path: str, pattern: str = "*.*") -> Dict[str, Any]:
+        """Ingest all matching files in a directory and report throughput."""
+        try:
+            report = self.rag.ingest_directory(path, pattern)
+            
+            return {
+                "success": not report.documents_failed,
+                "data": report.model_dump(),
+                "error": None if not report.documents_failed else f"{len(report.documents_failed)} files failed"
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "data": None,
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            }
+    
     def health_check(self) -> Dict[str, Any]:
         """Perform a health check."""
         try:
@@ -0,0 +1,128 @@
+"""BM25 index for BabyCare RAG system."""
+
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+# Words, with each CJK character as its own token (CJK text has no spaces)
+TOKEN_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]|[^\W\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens (single characters for CJK)."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Sparse term-document matrix with precomputed BM25 weights.
+
+    Row ``t`` of the CSR matrix holds the postings of term ``t``: the chunk
+    indices containing it and the full BM25 contribution of that term to each
+    chunk. Scoring a query is a single sparse matrix-vector product over the
+    rows of its terms.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75,
+                 tokenizer: Callable[[str], List[str]] = tokenize):
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer
+
+        self.vocabulary: Dict[str, int] = {}
+        self.doc_lengths = np.zeros(0, dtype=np.int32)
+        self.avg_doc_len = 0.0
+        self.weights = sparse.csr_matrix((0, 0), dtype=np.float32)
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.doc_lengths)
+
+    def doc_freqs(self) -> np.ndarray:
+        """Number of chunks containing each term (nonzeros per CSR row)."""
+        return np.diff(self.weights.indptr)
+
+    def build(self, texts: Iterable[str], reference: Optional["BM25Index"] = None) -> "BM25Index":
+        """Tokenize every text once and build the weighted CSR matrix.
+
+        With a ``reference`` index, document frequencies and the average
+        length also count the reference's chunks, so scores of this index can
+        be merged with the reference's (used for small delta segments).
+        """
+        vocabulary: Dict[str, int] = {}
+        term_ids, doc_ids, tfs, doc_lengths = [], [], [], []
+
+        for i, text in enumerate(texts):
+            terms = self.tokenizer(text or '')
+            doc_lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(i)
+                tfs.append(tf)
+
+        num_docs = len(doc_lengths)
+        self.vocabulary = vocabulary
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.int32)
+        self.avg_doc_len = float(self.doc_lengths.mean()) if num_docs else 0.0
+
+        if not num_docs or not self.avg_doc_len:
+            self.weights = sparse.csr_matrix((len(vocabulary), num_docs), dtype=np.float32)
+            return self
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        tfs = np.asarray(tfs, dtype=np.float64)
+
+        doc_freq = np.bincount(term_ids, minlength=len(vocabulary))
+        total_docs, avg_doc_len = num_docs, self.avg_doc_len
+        if reference is not None and reference.num_docs:
+            reference_ids = np.fromiter(
+                (reference.vocabulary.get(term, -1) for term in vocabulary), dtype=np.int64, count=len(vocabulary)
+            )
+            known = reference_ids >= 0
+            doc_freq[known] += reference.doc_freqs()[reference_ids[known]]
+            total_docs += reference.num_docs
+            avg_doc_len = float(reference.doc_lengths.sum() + self.doc_lengths.sum()) / total_docs
+        idf = np.log((total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        k1, b = self.k1, self.b
+        norm = k1 * (1 - b + b * self.doc_lengths[doc_ids] / avg_doc_len)
+        values = idf[term_ids] * (tfs * (k1 + 1)) / (tfs + norm)
+
+        self.weights = sparse.csr_matrix(
+            (values.astype(np.float32), (term_ids, doc_ids)),
+            shape=(len(vocabulary), num_docs)
+        )
+        return self
+
+    def search(self, query: str, top_k: int = 20) -> List[Tuple[int, float]]:
+        """Return the top_k (chunk index, score) pairs for a query."""
+        if top_k <= 0 or not self.num_docs or not self.avg_doc_len:
+            return []
+
+        term_counts = Counter(
+            self.vocabulary[term] for term in self.tokenizer(query) if term in self.vocabulary
+        )
+        if not term_counts:
+            return []
+
+        rows = np.fromiter(term_counts.keys(), dtype=np.int64, count=len(term_counts))
+        counts = np.fromiter(term_counts.values(), dtype=np.float32, count=len(term_counts))
+
+        # Repeated query terms count once per occurrence, as in classic BM25
+        query_weights = self.weights[rows]
+        scores = query_weights.T @ counts
+
+        # Only chunks that contain a query term are candidates
+        candidates = np.unique(query_weights.indices)
+        candidate_scores = scores[candidates]
+
+        if top_k < len(candidates):
+            top = np.argpartition(-candidate_scores, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-candidate_scores[top], kind='stable')]
+
+        return [(int(candidates[i]), float(candidate_scores[i])) for i in top]
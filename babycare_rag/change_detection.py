@@ -0,0 +1,49 @@
+"""File change detection for BabyCare RAG ingestion."""
+
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+_READ_SIZE = 1 << 20
+
+
+def _new_digest(algorithm: str):
+    # 128-bit BLAKE2b: faster than MD5 and plenty for change detection
+    return hashlib.blake2b(digest_size=16) if algorithm == "blake2b" else hashlib.new(algorithm)
+
+
+def _hash_file(path: Union[str, Path], *algorithms: str) -> List[str]:
+    digests = [_new_digest(algorithm) for algorithm in algorithms]
+    with open(path, 'rb') as f:
+        while block := f.read(_READ_SIZE):
+            for digest in digests:
+                digest.update(block)
+    return [digest.hexdigest() for digest in digests]
+
+
+def hash_file(path: Union[str, Path], algorithm: str = "blake2b") -> str:
+    """Hex digest of a file, read in 1 MiB blocks so memory use stays flat."""
+    return _hash_file(path, algorithm)[0]
+
+
+def check_file(path: Path, entry: Optional[Union[str, Dict[str, Any]]]) -> Tuple[bool, Dict[str, Any]]:
+    """Compare a file with its cache entry; returns (changed, new entry).
+
+    When size and mtime_ns match the entry the file is not read at all. A
+    stat change (e.g. a touch or copy) is confirmed by hashing the contents.
+    Legacy entries are plain MD5 strings; they are verified once with MD5
+    and upgraded, so existing caches do not trigger a full re-index.
+    """
+    stat = path.stat()
+    if isinstance(entry, dict) and entry.get("size") == stat.st_size \
+            and entry.get("mtime_ns") == stat.st_mtime_ns:
+        return False, entry
+
+    if isinstance(entry, str):
+        file_hash, legacy_hash = _hash_file(path, "blake2b", "md5")
+        changed = legacy_hash != entry
+    else:
+        file_hash = hash_file(path)
+        changed = entry is None or entry.get("hash") != file_hash
+
+    return changed, {"hash": file_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
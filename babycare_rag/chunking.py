@@ -0,0 +1,114 @@
+"""Text chunking for BabyCare RAG system."""
+
+import re
+from bisect import bisect_right
+from collections import deque
+from typing import Iterator, List, NamedTuple, Optional
+
+SENTENCE_END = re.compile(r'[.!?]')
+
+# Units the chunk budget is counted in. "token" approximates model tokens by
+# splitting punctuation from words.
+UNIT_PATTERNS = {
+    "word": re.compile(r'\S+'),
+    "token": re.compile(r'\w+|[^\w\s]'),
+}
+CHUNK_UNITS = ("char", "word", "token")
+
+
+class Chunk(NamedTuple):
+    """Chunk text with its [start, end) character offsets in the document."""
+    text: str
+    start: int
+    end: int
+
+
+def sentence_boundaries(text: str) -> List[int]:
+    """Offsets just past every sentence-ending character, in order."""
+    return [m.end() for m in SENTENCE_END.finditer(text)]
+
+
+def iter_chunks(
+    text: str,
+    size: int,
+    overlap: int = 0,
+    unit: str = "char",
+    sentence_window: Optional[int] = None
+) -> Iterator[Chunk]:
+    """Yield overlapping chunks of at most ``size`` units.
+
+    A chunk is shortened to end at a sentence boundary when one falls within
+    its last ``sentence_window`` units (default: a tenth of ``size``).
+    Sentence boundaries are computed once up front and found by bisection,
+    so the whole pass is linear in the document length. Word and token
+    chunking keep only the units of the current chunk in memory.
+    """
+    if unit not in CHUNK_UNITS:
+        raise ValueError(f"Unknown chunk unit: {unit}")
+    if size <= 0:
+        raise ValueError("Chunk size must be positive")
+    overlap = max(0, min(overlap, size - 1))
+    window = max(1, size // 10) if sentence_window is None else sentence_window
+    boundaries = sentence_boundaries(text)
+
+    if unit == "char":
+        yield from _char_chunks(text, size, overlap, window, boundaries)
+    else:
+        yield from _unit_chunks(text, size, overlap, window, boundaries, UNIT_PATTERNS[unit])
+
+
+def _char_chunks(text: str, size: int, overlap: int, window: int,
+                 boundaries: List[int]) -> Iterator[Chunk]:
+    start = 0
+    length = len(text)
+    while start < length:
+        end = start + size
+        if end < length and window > 0:
+            # Last boundary in (end - window, end + 1], after the sentence-ending character
+            i = bisect_right(boundaries, end + 1) - 1
+            if i >= 0 and boundaries[i] > max(start, end - window) + 1:
+                end = boundaries[i]
+
+        chunk = text[start:end].strip()
+        if chunk:
+            yield Chunk(chunk, start, end)
+
+        # Move start position with overlap
+        start = max(end - overlap, start + 1) if end < length else end
+
+
+def _unit_chunks(text: str, size: int, overlap: int, window: int,
+                 boundaries: List[int], pattern: re.Pattern) -> Iterator[Chunk]:
+    units = deque()
+    matches = pattern.finditer(text)
+    exhausted = False
+
+    while True:
+        # Fill the current chunk's units from the stream
+        while not exhausted and len(units) < size:
+            match = next(matches, None)
+            if match is None:
+                exhausted = True
+            else:
+                units.append(match.span())
+        if not units:
+            return
+
+        count = len(units)
+        if not exhausted and window > 0:
+            # Prefer the last unit within the window that ends a sentence
+            for k in range(count, max(0, count - window), -1):
+                unit_end = units[k - 1][1]
+                i = bisect_right(boundaries, unit_end) - 1
+                if i >= 0 and boundaries[i] == unit_end:
+                    count = k
+                    break
+
+        start, end = units[0][0], units[count - 1][1]
+        yield Chunk(text[start:end].strip(), start, end)
+
+        if exhausted and count == len(units):
+            return
+        # Keep the overlap, always advancing by at least one unit
+        for _ in range(max(1, count - overlap)):
+            units.popleft()
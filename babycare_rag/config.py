@@ -1,7 +1,7 @@
 """Configuration management for BabyCare RAG system."""
 
 import os
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
@@ -29,6 +29,21 @@ class RAGConfig(BaseModel):
         description="Embedding model name"
     )
     
+    embed_batch_size: int = Field(
+        default=32,
+        description="Texts sent per embedding request"
+    )
+    
+    embed_concurrency: int = Field(
+        default=4,
+        description="Maximum concurrent embedding requests"
+    )
+    
+    embed_max_retries: int = Field(
+        default=3,
+        description="Retries with backoff for failed embedding requests"
+    )
+    
     llm_model: str = Field(
         default="gemini-1.5-flash",
         description="LLM model name for generation"
@@ -47,12 +62,27 @@ class RAGConfig(BaseModel):
     
     chunk_size: int = Field(
         default=1000,
-        description="Document chunk size for processing"
+        description="Document chunk size for processing, in chunk_unit units"
     )
     
     chunk_overlap: int = Field(
         default=200,
-        description="Overlap between document chunks"
+        description="Overlap between document chunks, in chunk_unit units"
+    )
+    
+    chunk_unit: Literal["char", "word", "token"] = Field(
+        default="char",
+        description="Unit of the chunk budget: characters, words or approximate tokens"
+    )
+    
+    ingest_workers: int = Field(
+        default_factory=lambda: int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1)),
+        description="Processes converting documents in parallel when ingesting many files"
+    )
+    
+    markdown_cache_max_mb: int = Field(
+        default=512,
+        description="Disk space for converted markdown; least recently used entries are evicted"
     )
     
     # Storage Paths
@@ -82,6 +112,84 @@ class RAGConfig(BaseModel):
         description="Weight for vector search in hybrid search"
     )
     
+    # Vector Index Configuration
+    index_type: Literal["flat", "hnsw", "ivf_flat"] = Field(
+        default="flat",
+        description="FAISS index type: exact flat scan, HNSW graph or IVF-Flat"
+    )
+    
+    hnsw_m: int = Field(
+        default=32,
+        description="HNSW: neighbours per graph node"
+    )
+    
+    hnsw_ef_construction: int = Field(
+        default=40,
+        description="HNSW: candidate list size while building"
+    )
+    
+    hnsw_ef_search: int = Field(
+        default=64,
+        description="HNSW: candidate list size while searching"
+    )
+    
+    ivf_nlist: int = Field(
+        default=100,
+        description="IVF: number of clusters (capped by corpus size)"
+    )
+    
+    ivf_nprobe: int = Field(
+        default=8,
+        description="IVF: clusters scanned per query"
+    )
+    
+    mmap_index: bool = Field(
+        default_factory=lambda: os.getenv("FAISS_MMAP", "").lower() in ("1", "true", "yes"),
+        description="Memory-map index.bin read-only so processes share its pages"
+    )
+    
+    delta_max_chunks: int = Field(
+        default=1000,
+        description="Changed chunks searched as a delta next to the index before it is compacted"
+    )
+    
+    delta_max_ratio: float = Field(
+        default=0.05,
+        description="Delta size, as a fraction of the indexed chunks, allowed beyond delta_max_chunks"
+    )
+    
+    # Agent Runtime
+    mcp_pool_size: int = Field(
+        default=2,
+        description="Number of warm MCP server sessions kept for queries"
+    )
+    
+    agent_timeout_seconds: float = Field(
+        default=300.0,
+        description="Maximum time one agent run may take before the query fails"
+    )
+    
+    # Answer Cache
+    answer_cache: bool = Field(
+        default_factory=lambda: os.getenv("ANSWER_CACHE", "true").lower() in ("1", "true", "yes"),
+        description="Reuse answers to similar questions until the knowledge base changes"
+    )
+    
+    answer_cache_threshold: float = Field(
+        default=0.95,
+        description="Minimum cosine similarity between questions for a cache hit"
+    )
+    
+    answer_cache_ttl_seconds: float = Field(
+        default=86400.0,
+        description="Seconds a cached answer stays valid"
+    )
+    
+    answer_cache_max_entries: int = Field(
+        default=1000,
+        description="Maximum cached answers; least recently used are evicted"
+    )
+    
     def validate_config(self) -> bool:
         """Validate the configuration."""
         if not self.gemini_api_key:
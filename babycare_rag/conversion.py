@@ -0,0 +1,146 @@
+"""Parallel document conversion for BabyCare RAG system."""
+
+import multiprocessing
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, NamedTuple, Optional, Union
+
+from markitdown import MarkItDown
+
+from .change_detection import hash_file
+
+# One converter per worker process, created on first use
+_converter: Optional[MarkItDown] = None
+
+try:
+    CONVERTER_VERSION = f"markitdown-{version('markitdown')}"
+except PackageNotFoundError:
+    CONVERTER_VERSION = "markitdown-unknown"
+
+
+class Conversion(NamedTuple):
+    """Markdown converted from one file, or the error that stopped it."""
+    path: Path
+    text: Optional[str]
+    error: Optional[str]
+
+
+class MarkdownCache:
+    """Converted markdown on disk, zlib-compressed, keyed by file hash.
+
+    Entries are also keyed by the converter version, so upgrading MarkItDown
+    converts files again. Writes go through a temporary file and a rename,
+    so concurrent worker processes never read a partial entry. A hit
+    refreshes the entry's mtime, which ``prune`` uses as its last use.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path]):
+        self.cache_dir = Path(cache_dir)
+
+    def _entry(self, file_hash: str) -> Path:
+        return self.cache_dir / file_hash[:2] / f"{file_hash}-{CONVERTER_VERSION}.md.z"
+
+    def get(self, file_hash: str) -> Optional[str]:
+        entry = self._entry(file_hash)
+        try:
+            text = zlib.decompress(entry.read_bytes()).decode('utf-8')
+            os.utime(entry)
+            return text
+        except (FileNotFoundError, zlib.error):
+            return None
+
+    def put(self, file_hash: str, text: str):
+        entry = self._entry(file_hash)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry.with_name(f".{entry.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(zlib.compress(text.encode('utf-8'), 6))
+        os.replace(tmp_path, entry)
+
+    def prune(self, max_bytes: int):
+        """Delete the least recently used entries until at most max_bytes remain."""
+        entries = []
+        for entry in self.cache_dir.glob("*/*.md.z"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+
+def convert_file(path: Union[str, Path], cache_dir: Optional[Union[str, Path]] = None,
+                 file_hash: Optional[str] = None) -> Conversion:
+    """Convert one file to markdown text (runs inside worker processes).
+
+    With a ``cache_dir``, markdown converted earlier from identical file
+    contents is returned without running the converter. ``file_hash`` is
+    the file's hash_file digest when the caller already has it.
+    """
+    global _converter
+    try:
+        cache = MarkdownCache(cache_dir) if cache_dir is not None else None
+        if cache is not None and file_hash is None:
+            file_hash = hash_file(path)
+        if cache is not None:
+            text = cache.get(file_hash)
+            if text is not None:
+                return Conversion(Path(path), text, None)
+
+        if _converter is None:
+            _converter = MarkItDown()
+        text = _converter.convert(str(path)).text_content
+        if cache is not None:
+            cache.put(file_hash, text)
+        return Conversion(Path(path), text, None)
+    except Exception as e:
+        return Conversion(Path(path), None, str(e))
+
+
+def convert_files(paths: Iterable[Union[str, Path]], workers: int = 1,
+                  cache_dir: Optional[Union[str, Path]] = None,
+                  file_hashes: Optional[Mapping[Path, str]] = None,
+                  cache_max_bytes: Optional[int] = None) -> Iterator[Conversion]:
+    """Convert files to markdown, in parallel when workers > 1.
+
+    Results are yielded in the order of ``paths`` regardless of which worker
+    finishes first, so callers merging them into the index stay
+    deterministic. PDF parsing is CPU-bound, hence processes, not threads.
+    At most ``2 * workers`` files are in flight, so a slow consumer holds
+    back conversion instead of buffering every converted document.
+    ``file_hashes`` holds digests already computed for some of the paths.
+    Once all files are converted, the cache is pruned to ``cache_max_bytes``.
+    """
+    paths = iter(paths)
+    file_hashes = file_hashes or {}
+    if workers <= 1:
+        for path in paths:
+            yield convert_file(path, cache_dir, file_hashes.get(Path(path)))
+    else:
+        yield from _convert_in_processes(paths, workers, cache_dir, file_hashes)
+
+    if cache_dir is not None and cache_max_bytes is not None:
+        MarkdownCache(cache_dir).prune(cache_max_bytes)
+
+
+def _convert_in_processes(paths: Iterator[Union[str, Path]], workers: int,
+                          cache_dir: Optional[Union[str, Path]],
+                          file_hashes: Mapping[Path, str]) -> Iterator[Conversion]:
+    # Spawned workers: forking a process that runs the agent loop, embedding
+    # threads and SQLite connections can deadlock the child
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        pending = deque()
+        for path in paths:
+            pending.append(executor.submit(convert_file, path, cache_dir, file_hashes.get(Path(path))))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
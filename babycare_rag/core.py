@@ -1,20 +1,38 @@
 """Core BabyCare RAG system implementation."""
 
 import os
+import re
+import sys
 import asyncio
+import threading
 import uuid
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, List, Optional, Dict, Any, Tuple
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from datetime import datetime
 
+import numpy as np
+
+from .answer_cache import AnswerCache
 from .config import RAGConfig
 from .models import (
-    RAGResponse, DocumentInfo, SearchResult, SystemStats,
+    RAGResponse, DocumentInfo, SearchResult, SystemStats, IngestReport, AddDocumentResult,
     QueryRequest, AddDocumentRequest
 )
 from .document_processor import DocumentProcessor
+from .ingest import IngestPipeline
+from .metadata_store import MetadataStore
+from .output import echo
 from .search_engine import SearchEngine
 
+if TYPE_CHECKING:
+    # The agent modules live at the repository root and are imported lazily
+    from agent import AgentAnswer
+
+# "[Source: file, ID: chunk_id]" tag the MCP search tool puts after each snippet;
+# titles may contain commas, so the source ends at the last ", ID: "
+_SOURCE_TAG = re.compile(r'\[Source: (.+), ID: ([^\]]+)\]')
+
 
 class BabyCareRAG:
     """Main BabyCare RAG system class."""
@@ -24,26 +42,35 @@ class BabyCareRAG:
         self.config = config or RAGConfig.from_env()
         self.config.validate_config()
         
-        # Initialize components
-        self.document_processor = DocumentProcessor(self.config)
-        self.search_engine = SearchEngine(self.config)
+        # Initialize components around one shared metadata store
+        self.metadata_store = MetadataStore.for_index_dir(Path(self.config.index_dir))
+        self.document_processor = DocumentProcessor(self.config, store=self.metadata_store)
+        self.search_engine = SearchEngine(self.config, store=self.metadata_store)
+        self.answer_cache = self._make_answer_cache()
         
         # Ensure directories exist
         Path(self.config.documents_dir).mkdir(exist_ok=True)
         Path(self.config.index_dir).mkdir(exist_ok=True)
         
-        print(f"BabyCare RAG initialized with {len(self.list_documents())} documents")
+        # Agent runtime: a long-lived event loop owning the MCP session pool
+        self._agent_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._agent_thread: Optional[threading.Thread] = None
+        self._agent_lock = threading.Lock()
+        self._mcp_pool = None
+        self._mcp_pool_start: Optional[asyncio.Task] = None
+        
+        echo(f"BabyCare RAG initialized with {self.metadata_store.count_documents()} documents")
     
     def add_document(self, file_path: str, doc_type: str = "auto") -> bool:
         """Add a document from file path."""
         try:
             success = self.document_processor.add_document_from_file(file_path)
             if success:
-                # Rebuild search index to include new document
-                self.search_engine.rebuild_index()
+                # Add the new document's chunks to the search index
+                self.search_engine.update_index()
             return success
         except Exception as e:
-            print(f"Error adding document: {e}")
+            echo(f"Error adding document: {e}")
             return False
     
     def add_document_from_url(self, url: str) -> bool:
@@ -51,11 +78,11 @@ class BabyCareRAG:
         try:
             success = self.document_processor.add_document_from_url(url)
             if success:
-                # Rebuild search index to include new document
-                self.search_engine.rebuild_index()
+                # Add the new document's chunks to the search index
+                self.search_engine.update_index()
             return success
         except Exception as e:
-            print(f"Error adding document from URL: {e}")
+            echo(f"Error adding document from URL: {e}")
             return False
     
     def add_document_from_text(self, text: str, title: str) -> bool:
@@ -63,13 +90,37 @@ class BabyCareRAG:
         try:
             success = self.document_processor.add_document_from_text(text, title)
             if success:
-                # Rebuild search index to include new document
-                self.search_engine.rebuild_index()
+                # Add the new document's chunks to the search index
+                self.search_engine.update_index()
             return success
         except Exception as e:
-            print(f"Error adding document from text: {e}")
+            echo(f"Error adding document from text: {e}")
             return False
     
+    def add_documents(self, file_paths: List[str]) -> List[AddDocumentResult]:
+        """Add several documents from file paths, updating the index once."""
+        results = self.document_processor.add_documents_from_files(file_paths)
+        return self._finish_bulk_add(results)
+    
+    def add_texts(self, texts: List[Dict[str, str]]) -> List[AddDocumentResult]:
+        """Add several text documents ({"text", "title"} items), updating the index once."""
+        results = self.document_processor.add_documents_from_texts(texts)
+        return self._finish_bulk_add(results)
+    
+    def _finish_bulk_add(self, results: List[AddDocumentResult]) -> List[AddDocumentResult]:
+        """Index all stored documents of a bulk add in a single update."""
+        if any(result.success for result in results):
+            if not self.search_engine.update_index():
+                # Stored but not searchable; report it per item
+                for result in results:
+                    if result.success:
+                        result.success = False
+                        result.error = "Failed to update search index"
+        
+        added = sum(result.success for result in results)
+        echo(f"Added {added}/{len(results)} documents")
+        return results
+    
     def list_documents(self) -> List[DocumentInfo]:
         """List all documents in the knowledge base."""
         return self.document_processor.list_documents()
@@ -79,11 +130,11 @@ class BabyCareRAG:
         try:
             success = self.document_processor.remove_document(doc_id)
             if success:
-                # Rebuild search index after removal
-                self.search_engine.rebuild_index()
+                # Drop the removed document's chunks from the search index
+                self.search_engine.update_index()
             return success
         except Exception as e:
-            print(f"Error removing document: {e}")
+            echo(f"Error removing document: {e}")
             return False
     
     def search_documents(self, query: str, top_k: int = 5) -> List[SearchResult]:
@@ -93,102 +144,271 @@ class BabyCareRAG:
     def query(self, question: str, max_steps: int = 5) -> RAGResponse:
         """Process a query and generate a response using the original agent system."""
         try:
-            # Import the original agent system
-            import sys
-            import re
-            sys.path.append(str(Path(__file__).parent.parent))
+            cached, vector, generation = self._cached_response(question)
+            if cached is not None:
+                return cached
+            
+            # Run the agent on the persistent loop that owns the MCP session pool;
+            # it hands back the snippets returned by its search_documents calls
+            retrievals: List[str] = []
+            answer = self._run_agent(question, retrievals)
+            response = self._build_response(question, answer.text, retrievals)
+            self._cache_response(question, vector, generation, answer, response)
+            return response
+        except Exception as e:
+            return self._error_response(e)
+    
+    async def aquery(self, question: str, max_steps: int = 5) -> RAGResponse:
+        """Async version of query, safe to call from any running event loop.
+        
+        The agent runs on the shared agent loop with the warm MCP sessions and
+        blocking post-processing runs in a worker thread, so the caller's loop
+        stays free and many questions can be in flight at once.
+        """
+        try:
+            cached, vector, generation = await asyncio.to_thread(self._cached_response, question)
+            if cached is not None:
+                return cached
+            
+            retrievals: List[str] = []
+            answer = await asyncio.wait_for(
+                asyncio.wrap_future(self._submit_agent(question, retrievals)),
+                self.config.agent_timeout_seconds
+            )
+            response = await asyncio.to_thread(self._build_response, question, answer.text, retrievals)
+            await asyncio.to_thread(self._cache_response, question, vector, generation, answer, response)
+            return response
+        except Exception as e:
+            return self._error_response(e)
+    
+    async def aquery_many(self, questions: List[str], concurrency: Optional[int] = None) -> List[RAGResponse]:
+        """Answer several questions concurrently; responses are in input order.
+        
+        At most ``concurrency`` questions run at once (default: the MCP
+        session pool size, since each running question holds one session).
+        """
+        limit = asyncio.Semaphore(max(1, concurrency or self.config.mcp_pool_size))
+        
+        async def bounded(question: str) -> RAGResponse:
+            async with limit:
+                return await self.aquery(question)
+        
+        return list(await asyncio.gather(*(bounded(question) for question in questions)))
+    
+    async def asearch_documents(self, query: str, top_k: int = 5) -> List[SearchResult]:
+        """Async version of search_documents; the search runs in a worker thread."""
+        return await asyncio.to_thread(self.search_documents, query, top_k)
+    
+    def _make_answer_cache(self) -> Optional[AnswerCache]:
+        if not self.config.answer_cache:
+            return None
+        return AnswerCache(
+            Path(self.config.index_dir) / "answer_cache.sqlite",
+            model=self.search_engine.embed_cache_model,
+            threshold=self.config.answer_cache_threshold,
+            ttl_seconds=self.config.answer_cache_ttl_seconds,
+            max_entries=self.config.answer_cache_max_entries
+        )
+    
+    def _cached_response(self, question: str) -> Tuple[Optional[RAGResponse], Optional[np.ndarray], Optional[int]]:
+        """Cached response for a similar question, plus the question's embedding and store generation."""
+        if self.answer_cache is None:
+            return None, None, None
+        try:
+            generation = self.metadata_store.generation()
+            vector = self.search_engine.embed_query(question)
+            response = self.answer_cache.get(vector, generation)
+        except Exception as e:
+            echo(f"Error reading answer cache: {e}")
+            return None, None, None
+        if response is not None:
+            response.processing_steps = response.processing_steps + ["Returned cached answer for a similar question"]
+        return response, vector, generation
+    
+    def _cache_response(self, question: str, vector: Optional[np.ndarray], generation: Optional[int],
+                        answer: "AgentAnswer", response: RAGResponse):
+        """Cache a response under the generation it was computed for, if the agent answered.
+        
+        Nothing is cached when the knowledge base changed while the agent ran,
+        since the answer may mix old and new documents.
+        """
+        if self.answer_cache is None or vector is None or not answer.answered:
+            return
+        try:
+            if self.metadata_store.generation() != generation:
+                return
+            self.answer_cache.put(question, vector, response, generation)
+        except Exception as e:
+            echo(f"Error writing answer cache: {e}")
+    
+    def _build_response(self, question: str, answer: str, retrievals: List[str]) -> RAGResponse:
+        """Turn the agent's answer and retrieved snippets into a RAGResponse."""
+        # Reuse the agent's retrieval; search here only if it never searched
+        search_results = self._results_from_retrievals(retrievals)
+        if not search_results:
+            search_results = self.search_documents(question, self.config.top_k)
+        search_result_texts = retrievals or [result.text for result in search_results]
 
-            from agent import main as agent_main
+        # Extract unique sources from search results
+        sources = []
+        for result in search_results:
+            if result.source not in sources:
+                sources.append(result.source)
 
-            # Run the agent asynchronously
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                answer = loop.run_until_complete(agent_main(question))
+        # Clean the answer and add sources in parentheses
+        clean_answer = answer.strip('[]').strip()
 
-                # Get search results for sources using the original search function
-                from math_mcp_embeddings import search_documents as original_search
-                search_result_texts = original_search(question)
+        # Handle the case where answer might be "No response generated." or similar
+        if clean_answer in ["No response generated.", "No response generated", "", "I was unable to find a complete answer to your question based on the available information."]:
+            # Try to extract information from search results as fallback
+            if search_result_texts:
+                # Look for temperature information in search results - broader pattern
+                temp_patterns = [
+                    r"Room temperature\s+(\d+)(?:\s*[-–~to]\s*(\d+))?\s*°?\s*C\s*\((\d+)(?:\s*[-–~to]\s*(\d+))?\s*°?\s*F\)",
+                    r"(\d+)(?:\s*[-–~to]\s*(\d+))?\s*°?\s*C\s*\((\d+)(?:\s*[-–~to]\s*(\d+))?\s*°?\s*F\)",
+                    r"temperature.*?(\d+)(?:\s*[-–~to]\s*(\d+))?\s*°?\s*C",
+                    r"temperature.*?(\d+)(?:\s*[-–~to]\s*(\d+))?\s*°?\s*F"
+                ]
 
-                # Extract unique sources from search results
-                sources = []
                 for result_text in search_result_texts:
-                    # Extract source from [Source: filename, ID: chunk_id] pattern
-                    source_match = re.search(r'\[Source: ([^,]+),', result_text)
-                    if source_match:
-                        source = source_match.group(1).strip()
-                        if source not in sources:
-                            sources.append(source)
-
-                # Clean the answer and add sources in parentheses
-                clean_answer = answer.strip('[]').strip()
-
-                # Handle the case where answer might be "No response generated." or similar
-                if clean_answer in ["No response generated.", "No response generated", "", "I was unable to find a complete answer to your question based on the available information."]:
-                    # Try to extract information from search results as fallback
-                    if search_result_texts:
-                        # Look for temperature information in search results - broader pattern
-                        temp_patterns = [
-                            r"Room temperature\s+(\d+)(?:\s*[-–~to]\s*(\d+))?\s*°?\s*C\s*\((\d+)(?:\s*[-–~to]\s*(\d+))?\s*°?\s*F\)",
-                            r"(\d+)(?:\s*[-–~to]\s*(\d+))?\s*°?\s*C\s*\((\d+)(?:\s*[-–~to]\s*(\d+))?\s*°?\s*F\)",
-                            r"temperature.*?(\d+)(?:\s*[-–~to]\s*(\d+))?\s*°?\s*C",
-                            r"temperature.*?(\d+)(?:\s*[-–~to]\s*(\d+))?\s*°?\s*F"
-                        ]
-
-                        for result_text in search_result_texts:
-                            for pattern in temp_patterns:
-                                match = re.search(pattern, result_text, flags=re.IGNORECASE)
-                                if match:
-                                    # Extract the temperature range
-                                    if "Room temperature" in result_text and "16" in result_text and "29" in result_text:
-                                        clean_answer = "16–29°C (60–85°F)"
-                                        break
-                                    elif match.groups():
-                                        # Try to construct a meaningful temperature answer
-                                        groups = [g for g in match.groups() if g]
-                                        if len(groups) >= 2:
-                                            clean_answer = f"{groups[0]}–{groups[1]}°C"
-                                        else:
-                                            clean_answer = f"{groups[0]}°C"
-                                        break
-                            if clean_answer not in ["No response generated.", "No response generated", "", "I was unable to find a complete answer to your question based on the available information."]:
+                    for pattern in temp_patterns:
+                        match = re.search(pattern, result_text, flags=re.IGNORECASE)
+                        if match:
+                            # Extract the temperature range
+                            if "Room temperature" in result_text and "16" in result_text and "29" in result_text:
+                                clean_answer = "16–29°C (60–85°F)"
                                 break
+                            elif match.groups():
+                                # Try to construct a meaningful temperature answer
+                                groups = [g for g in match.groups() if g]
+                                if len(groups) >= 2:
+                                    clean_answer = f"{groups[0]}–{groups[1]}°C"
+                                else:
+                                    clean_answer = f"{groups[0]}°C"
+                                break
+                    if clean_answer not in ["No response generated.", "No response generated", "", "I was unable to find a complete answer to your question based on the available information."]:
+                        break
 
-                        # If still no answer, provide a generic response
-                        if clean_answer in ["No response generated.", "No response generated", "", "I was unable to find a complete answer to your question based on the available information."]:
-                            clean_answer = "I found some relevant information but could not extract a specific answer. Please check the source documents for details."
-
-                if sources:
-                    source_text = "(" + ", ".join(sources) + ")"
-                    final_answer = f"{clean_answer} {source_text}"
-                else:
-                    final_answer = clean_answer
+                # If still no answer, provide a generic response
+                if clean_answer in ["No response generated.", "No response generated", "", "I was unable to find a complete answer to your question based on the available information."]:
+                    clean_answer = "I found some relevant information but could not extract a specific answer. Please check the source documents for details."
 
-                # Get search results for the response object
-                search_results = self.search_documents(question, self.config.top_k)
+        if sources:
+            source_text = "(" + ", ".join(sources) + ")"
+            final_answer = f"{clean_answer} {source_text}"
+        else:
+            final_answer = clean_answer
 
-                return RAGResponse(
-                    answer=final_answer,
-                    sources=sources,
-                    confidence=0.8,  # Default confidence
-                    processing_steps=[
-                        "Analyzed user question",
-                        "Retrieved relevant documents",
-                        "Generated response using agent system"
-                    ],
-                    search_results=search_results
+        return RAGResponse(
+            answer=final_answer,
+            sources=sources,
+            confidence=0.8,  # Default confidence
+            processing_steps=[
+                "Analyzed user question",
+                "Retrieved relevant documents",
+                "Generated response using agent system"
+            ],
+            search_results=search_results[:self.config.top_k]
+        )
+    
+    @staticmethod
+    def _error_response(error: Exception) -> RAGResponse:
+        echo(f"Error processing query: {error}")
+        return RAGResponse(
+            answer=f"Sorry, I encountered an error processing your question: {str(error)}",
+            sources=[],
+            confidence=0.0,
+            processing_steps=["Error occurred during processing"]
+        )
+    
+    def _results_from_retrievals(self, retrievals: List[str]) -> List[SearchResult]:
+        """Search results for the chunks the agent's tool calls returned.
+        
+        Legacy chunks are stored under "<file>#<chunk_id>" but tagged with
+        their raw chunk_id, so both keys are looked up.
+        """
+        chunk_ids = []
+        for text in retrievals:
+            for match in _SOURCE_TAG.finditer(text):
+                source, chunk_id = match.group(1).strip(), match.group(2).strip()
+                chunk_ids.extend([chunk_id, f"{source}#{chunk_id}"])
+        return self.search_engine.results_for_chunks(chunk_ids) if chunk_ids else []
+    
+    def _ensure_agent_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the background event loop used for agent runs."""
+        with self._agent_lock:
+            if self._agent_loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="babycare-agent-loop", daemon=True
                 )
-            finally:
-                loop.close()
-
-        except Exception as e:
-            print(f"Error processing query: {e}")
-            return RAGResponse(
-                answer=f"Sorry, I encountered an error processing your question: {str(e)}",
-                sources=[],
-                confidence=0.0,
-                processing_steps=["Error occurred during processing"]
-            )
+                thread.start()
+                self._agent_loop, self._agent_thread = loop, thread
+            return self._agent_loop
+    
+    async def _get_mcp_pool(self):
+        """Create and warm the MCP session pool on first use."""
+        from mcp_pool import MCPSessionPool
+        
+        if self._mcp_pool is None:
+            self._mcp_pool = MCPSessionPool(size=self.config.mcp_pool_size)
+            self._mcp_pool_start = asyncio.ensure_future(self._mcp_pool.start())
+        try:
+            await asyncio.shield(self._mcp_pool_start)
+        except Exception:
+            # Let the next query retry from scratch
+            self._mcp_pool = None
+            self._mcp_pool_start = None
+            raise
+        return self._mcp_pool
+    
+    async def _agent_main(self, question: str, retrievals: Optional[List[str]] = None) -> "AgentAnswer":
+        # The agent modules live at the repository root
+        root = str(Path(__file__).parent.parent)
+        if root not in sys.path:
+            sys.path.append(root)
+        from agent import run as agent_run
+        
+        pool = await self._get_mcp_pool()
+        return await agent_run(question, pool=pool, retrievals=retrievals)
+    
+    def _run_agent(self, question: str, retrievals: Optional[List[str]] = None) -> "AgentAnswer":
+        """Run the agent for one question, reusing warm MCP sessions.
+        
+        Snippets from the agent's search_documents calls are appended to
+        ``retrievals`` when given. The run is cancelled if it takes longer
+        than agent_timeout_seconds.
+        """
+        future = self._submit_agent(question, retrievals)
+        try:
+            return future.result(timeout=self.config.agent_timeout_seconds)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+    
+    def _submit_agent(self, question: str, retrievals: Optional[List[str]] = None) -> "Future[AgentAnswer]":
+        """Schedule an agent run on the agent loop and return its future."""
+        loop = self._ensure_agent_loop()
+        return asyncio.run_coroutine_threadsafe(self._agent_main(question, retrievals), loop)
+    
+    def close(self):
+        """Shut down the MCP session pool and the agent event loop."""
+        with self._agent_lock:
+            loop, self._agent_loop = self._agent_loop, None
+            thread, self._agent_thread = self._agent_thread, None
+        if loop is None:
+            return
+        
+        if self._mcp_pool is not None:
+            pool, self._mcp_pool = self._mcp_pool, None
+            self._mcp_pool_start = None
+            try:
+                asyncio.run_coroutine_threadsafe(pool.close(), loop).result(timeout=30)
+            except Exception as e:
+                echo(f"Error closing MCP session pool: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
     
     def update_config(self, config: RAGConfig) -> bool:
         """Update the system configuration."""
@@ -197,27 +417,51 @@ class BabyCareRAG:
             self.config = config
             
             # Reinitialize components with new config
-            self.document_processor = DocumentProcessor(self.config)
-            self.search_engine = SearchEngine(self.config)
+            self.metadata_store = MetadataStore.for_index_dir(Path(self.config.index_dir))
+            self.document_processor = DocumentProcessor(self.config, store=self.metadata_store)
+            self.search_engine = SearchEngine(self.config, store=self.metadata_store)
+            self.answer_cache = self._make_answer_cache()
             
             return True
         except Exception as e:
-            print(f"Error updating config: {e}")
+            echo(f"Error updating config: {e}")
             return False
     
     def get_config(self) -> RAGConfig:
         """Get current system configuration."""
         return self.config
     
-    def rebuild_index(self) -> bool:
-        """Rebuild the search index."""
+    def rebuild_index(self, background: bool = False) -> bool:
+        """Rebuild the search index.
+        
+        With background=True the rebuild runs on a worker thread and this
+        returns True as soon as it is scheduled; queries keep using the
+        current index until the new generation is published.
+        """
+        if background:
+            self.search_engine.rebuild_in_background()
+            return True
         return self.search_engine.rebuild_index()
     
+    def ingest_directory(self, path: str, pattern: str = "*.*") -> IngestReport:
+        """Ingest every matching file in a directory through the streaming pipeline.
+        
+        Conversion, chunking, embedding and indexing run concurrently and the
+        index is saved once. The report includes docs/s and chunks/s.
+        """
+        directory = Path(path)
+        if not directory.is_dir():
+            raise NotADirectoryError(f"Not a directory: {directory}")
+        
+        files = sorted(p for p in directory.glob(pattern) if p.is_file())
+        pipeline = IngestPipeline(self.document_processor, self.search_engine)
+        return pipeline.run(files)
+    
     def get_stats(self) -> SystemStats:
         """Get system statistics."""
         try:
-            documents = self.list_documents()
-            total_chunks = sum(doc.chunk_count for doc in documents)
+            total_documents = self.metadata_store.count_documents()
+            total_chunks = self.metadata_store.count_chunks()
             
             # Calculate storage used
             storage_used = 0
@@ -227,12 +471,12 @@ class BabyCareRAG:
                     if file_path.is_file():
                         storage_used += file_path.stat().st_size
             
-            # Get index size
-            index_file = index_dir / "index.bin"
-            index_size = index_file.stat().st_size if index_file.exists() else 0
+            # Get index size of the live generation
+            index_file = self.search_engine.current_index_file()
+            index_size = index_file.stat().st_size if index_file and index_file.exists() else 0
             
             return SystemStats(
-                total_documents=len(documents),
+                total_documents=total_documents,
                 total_chunks=total_chunks,
                 index_size=index_size,
                 last_updated=datetime.now().isoformat(),
@@ -242,7 +486,7 @@ class BabyCareRAG:
             )
             
         except Exception as e:
-            print(f"Error getting stats: {e}")
+            echo(f"Error getting stats: {e}")
             return SystemStats(
                 total_documents=0,
                 total_chunks=0,
@@ -261,6 +505,13 @@ class BabyCareRAG:
             max_steps=request.max_steps or self.config.max_steps
         )
     
+    async def aprocess_request(self, request: QueryRequest) -> RAGResponse:
+        """Process a query request without blocking the event loop."""
+        return await self.aquery(
+            question=request.question,
+            max_steps=request.max_steps or self.config.max_steps
+        )
+    
     def add_document_request(self, request: AddDocumentRequest) -> bool:
         """Process an add document request."""
         if request.file_path:
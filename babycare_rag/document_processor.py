@@ -1,52 +1,61 @@
 """Document processing module for BabyCare RAG system."""
 
 import os
-import json
 import hashlib
 import requests
-import time
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from markitdown import MarkItDown
+from typing import List, Dict, Any, Optional, Tuple
 
+from .chunking import iter_chunks
 from .config import RAGConfig
-from .models import DocumentInfo
+from .conversion import MarkdownCache, convert_file, convert_files
+from .metadata_store import MetadataStore
+from .output import echo
+from .models import AddDocumentResult, DocumentInfo
 
 
 class DocumentProcessor:
     """Handles document processing, chunking, and indexing."""
     
-    def __init__(self, config: RAGConfig):
+    def __init__(self, config: RAGConfig, store: Optional[MetadataStore] = None):
         self.config = config
-        self.md = MarkItDown()
         self.documents_dir = Path(config.documents_dir)
         self.index_dir = Path(config.index_dir)
+        # Converted markdown by file hash, so re-chunking skips conversion
+        self.markdown_cache_dir = self.index_dir / "markdown_cache"
+        self.markdown_cache_max_bytes = config.markdown_cache_max_mb * 1024 * 1024
         
         # Ensure directories exist
         self.documents_dir.mkdir(exist_ok=True)
         self.index_dir.mkdir(exist_ok=True)
+        
+        self.store = store or MetadataStore.for_index_dir(self.index_dir)
     
     def add_document_from_file(self, file_path: str, title: Optional[str] = None) -> bool:
         """Add a document from a file path."""
         try:
-            file_path = Path(file_path)
-            if not file_path.exists():
-                raise FileNotFoundError(f"File not found: {file_path}")
-            
-            # Copy file to documents directory if not already there
-            if not file_path.is_relative_to(self.documents_dir):
-                dest_path = self.documents_dir / file_path.name
-                import shutil
-                shutil.copy2(file_path, dest_path)
-                file_path = dest_path
+            file_path = self.import_file(file_path)
             
             # Process the document
             return self._process_single_document(file_path, title)
             
         except Exception as e:
-            print(f"Error adding document from file: {e}")
+            echo(f"Error adding document from file: {e}")
             return False
     
+    def import_file(self, file_path: str) -> Path:
+        """Copy a file into the documents directory if not already there."""
+        file_path = Path(file_path)
+        if not file_path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        if not file_path.is_relative_to(self.documents_dir):
+            dest_path = self.documents_dir / file_path.name
+            import shutil
+            shutil.copy2(file_path, dest_path)
+            file_path = dest_path
+        return file_path
+    
     def add_document_from_url(self, url: str, title: Optional[str] = None) -> bool:
         """Add a document from a URL."""
         try:
@@ -70,222 +79,192 @@ class DocumentProcessor:
             return self._process_single_document(file_path, title or url)
             
         except Exception as e:
-            print(f"Error adding document from URL: {e}")
+            echo(f"Error adding document from URL: {e}")
             return False
     
+    def _write_text_file(self, text: str, title: str) -> Path:
+        """Save text content as a file in the documents directory."""
+        filename = f"{hashlib.md5(title.encode()).hexdigest()[:8]}_{title[:50]}.txt"
+        # Clean filename
+        filename = "".join(c for c in filename if c.isalnum() or c in "._- ").strip()
+        file_path = self.documents_dir / filename
+        
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return file_path
+    
     def add_document_from_text(self, text: str, title: str) -> bool:
         """Add a document from text content."""
         try:
             # Create a text file
-            filename = f"{hashlib.md5(title.encode()).hexdigest()[:8]}_{title[:50]}.txt"
-            # Clean filename
-            filename = "".join(c for c in filename if c.isalnum() or c in "._- ").strip()
-            file_path = self.documents_dir / filename
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(text)
+            file_path = self._write_text_file(text, title)
             
             # Process the document
             return self._process_single_document(file_path, title)
             
         except Exception as e:
-            print(f"Error adding document from text: {e}")
+            echo(f"Error adding document from text: {e}")
             return False
     
+    def add_documents_from_files(self, file_paths: List[str]) -> List[AddDocumentResult]:
+        """Add several documents, converting them in parallel.
+        
+        Files are converted by ``config.ingest_workers`` processes and stored
+        in the order given, so the resulting chunk order is deterministic.
+        Returns one result per input path, in input order.
+        """
+        results: List[Optional[AddDocumentResult]] = [None] * len(file_paths)
+        pending: List[Tuple[int, Path]] = []
+        for i, file_path in enumerate(file_paths):
+            try:
+                pending.append((i, self.import_file(file_path)))
+            except Exception as e:
+                echo(f"Error adding document from file: {e}")
+                results[i] = AddDocumentResult(source=str(file_path), success=False, error=str(e))
+        
+        conversions = convert_files(
+            [path for _, path in pending], self.config.ingest_workers, self.markdown_cache_dir,
+            cache_max_bytes=self.markdown_cache_max_bytes
+        )
+        for (i, _), conversion in zip(pending, conversions):
+            source = str(file_paths[i])
+            try:
+                if conversion.error is not None:
+                    raise RuntimeError(conversion.error)
+                chunks = self.store_document(conversion.path, conversion.text)
+                results[i] = AddDocumentResult(
+                    source=source, success=True,
+                    doc_id=self.doc_id_for(conversion.path), chunk_count=len(chunks)
+                )
+            except Exception as e:
+                echo(f"Error processing document {conversion.path}: {e}")
+                results[i] = AddDocumentResult(source=source, success=False, error=str(e))
+        
+        return results
+    
+    def add_documents_from_texts(self, texts: List[Dict[str, str]]) -> List[AddDocumentResult]:
+        """Add several text documents ({"text", "title"} items), in input order.
+        
+        Plain text needs no conversion, so it is chunked and stored directly.
+        """
+        results = []
+        for item in texts:
+            title = item.get('title') or ''
+            try:
+                if not title:
+                    raise ValueError("Title is required")
+                file_path = self._write_text_file(item['text'], title)
+                chunks = self.store_document(file_path, item['text'], title)
+                results.append(AddDocumentResult(
+                    source=title, success=True,
+                    doc_id=self.doc_id_for(file_path), chunk_count=len(chunks)
+                ))
+            except Exception as e:
+                echo(f"Error adding document from text: {e}")
+                results.append(AddDocumentResult(source=title, success=False, error=str(e)))
+        return results
+    
     def _process_single_document(self, file_path: Path, title: Optional[str] = None) -> bool:
         """Process a single document and add to index."""
         try:
-            # Convert document to markdown
-            result = self.md.convert(str(file_path))
-            content = result.text_content
-            
-            if not content.strip():
-                print(f"Warning: No content extracted from {file_path}")
-                return False
-            
-            # Create document info
-            doc_info = DocumentInfo(
-                doc_id=hashlib.md5(str(file_path).encode()).hexdigest(),
-                title=title or file_path.stem,
-                file_path=str(file_path),
-                added_date=str(file_path.stat().st_mtime),
-                chunk_count=0,  # Will be updated after chunking
-                file_size=file_path.stat().st_size,
-                doc_type=file_path.suffix.lower()
-            )
-            
-            # Chunk the document
-            chunks = self._chunk_document(content, doc_info.doc_id)
-            doc_info.chunk_count = len(chunks)
-            
-            # Update metadata
-            self._update_metadata(doc_info, chunks)
-            
-            print(f"Successfully processed document: {doc_info.title} ({len(chunks)} chunks)")
+            # Convert document to markdown (or reuse an earlier conversion)
+            conversion = convert_file(file_path, self.markdown_cache_dir)
+            MarkdownCache(self.markdown_cache_dir).prune(self.markdown_cache_max_bytes)
+            if conversion.error is not None:
+                raise RuntimeError(conversion.error)
+            self.store_document(file_path, conversion.text, title)
             return True
             
         except Exception as e:
-            print(f"Error processing document {file_path}: {e}")
+            echo(f"Error processing document {file_path}: {e}")
             return False
     
-    def _chunk_document(self, content: str, doc_id: str) -> List[Dict[str, Any]]:
-        """Chunk a document into smaller pieces."""
-        chunks = []
-        chunk_size = self.config.chunk_size
-        overlap = self.config.chunk_overlap
+    def doc_id_for(self, file_path: Path) -> str:
+        """Document id of a stored file.
         
-        # Simple chunking by character count
-        start = 0
-        chunk_id = 0
+        Files in the documents directory are hashed as "<directory name>/<path
+        inside it>", so processes configured with a relative and an absolute
+        documents_dir agree, and ids from the default relative "documents"
+        stay as they were.
+        """
+        file_path = Path(file_path).resolve()
+        documents_dir = self.documents_dir.resolve()
+        if file_path.is_relative_to(documents_dir):
+            key = (Path(documents_dir.name) / file_path.relative_to(documents_dir)).as_posix()
+        else:
+            key = str(file_path)
+        return hashlib.md5(key.encode()).hexdigest()
+    
+    def store_document(self, file_path: Path, content: str,
+                       title: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Chunk converted document text and store it; returns the chunks."""
+        if not content.strip():
+            raise ValueError(f"No content extracted from {file_path}")
         
-        while start < len(content):
-            end = start + chunk_size
-            
-            # Try to break at sentence boundary
-            if end < len(content):
-                # Look for sentence endings within the last 100 characters
-                search_start = max(start, end - 100)
-                sentence_end = -1
-                for i in range(end, search_start, -1):
-                    if content[i] in '.!?':
-                        sentence_end = i + 1
-                        break
-                
-                if sentence_end > 0:
-                    end = sentence_end
-            
-            chunk_text = content[start:end].strip()
-            
-            if chunk_text:
-                chunks.append({
-                    'id': f"{doc_id}_{chunk_id}",
-                    'doc_id': doc_id,
-                    'chunk_id': chunk_id,
-                    'text': chunk_text,
-                    'start_pos': start,
-                    'end_pos': end
-                })
-                chunk_id += 1
-            
-            # Move start position with overlap
-            start = end - overlap if end < len(content) else end
+        # Create document info; a re-ingested document keeps its stored title
+        doc_id = self.doc_id_for(file_path)
+        if title is None:
+            stored = self.store.get_document(doc_id)
+            title = stored['title'] if stored else None
+        doc_info = DocumentInfo(
+            doc_id=doc_id,
+            title=title or file_path.stem,
+            file_path=str(file_path),
+            added_date=str(file_path.stat().st_mtime),
+            chunk_count=0,  # Will be updated after chunking
+            file_size=file_path.stat().st_size,
+            doc_type=file_path.suffix.lower()
+        )
+        
+        # Chunk the document
+        chunks = self._chunk_document(content, doc_info.doc_id)
+        doc_info.chunk_count = len(chunks)
         
+        # Update metadata
+        self._update_metadata(doc_info, chunks)
+        
+        echo(f"Successfully processed document: {doc_info.title} ({len(chunks)} chunks)")
         return chunks
     
+    def _chunk_document(self, content: str, doc_id: str) -> List[Dict[str, Any]]:
+        """Chunk a document into smaller pieces."""
+        chunks = iter_chunks(
+            content,
+            self.config.chunk_size,
+            self.config.chunk_overlap,
+            unit=self.config.chunk_unit
+        )
+        return [
+            {
+                'id': f"{doc_id}_{chunk_id}",
+                'doc_id': doc_id,
+                'chunk_id': chunk_id,
+                'text': chunk.text,
+                'start_pos': chunk.start,
+                'end_pos': chunk.end
+            }
+            for chunk_id, chunk in enumerate(chunks)
+        ]
+    
     def _update_metadata(self, doc_info: DocumentInfo, chunks: List[Dict[str, Any]]):
-        """Update metadata file with new document and chunks."""
-        metadata_file = self.index_dir / "metadata.json"
-
-        # Load existing metadata
-        if metadata_file.exists():
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-
-                # Handle old format (array) vs new format (object)
-                if isinstance(existing_data, list):
-                    # Convert old format to new format
-                    metadata = {'documents': {}, 'chunks': existing_data}
-                    # Try to extract document info from chunks
-                    for chunk in existing_data:
-                        if 'doc' in chunk:
-                            doc_name = chunk['doc']
-                            doc_id = hashlib.md5(doc_name.encode()).hexdigest()
-                            if doc_id not in metadata['documents']:
-                                metadata['documents'][doc_id] = {
-                                    'doc_id': doc_id,
-                                    'title': doc_name,
-                                    'file_path': f"documents/{doc_name}",
-                                    'added_date': str(time.time()),
-                                    'chunk_count': 0,
-                                    'file_size': 0,
-                                    'doc_type': '.pdf'
-                                }
-                else:
-                    metadata = existing_data
-        else:
-            metadata = {'documents': {}, 'chunks': []}
-
-        # Add document info
-        metadata['documents'][doc_info.doc_id] = doc_info.model_dump()
-
-        # Add chunks
-        metadata['chunks'].extend(chunks)
-
-        # Save updated metadata
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        """Store the document and its chunks, replacing a previous version."""
+        self.store.add_document(doc_info.model_dump(), chunks)
     
     def list_documents(self) -> List[DocumentInfo]:
         """List all documents in the knowledge base."""
-        metadata_file = self.index_dir / "metadata.json"
-
-        if not metadata_file.exists():
-            return []
-
         try:
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-
-                # Handle old format (array) vs new format (object)
-                if isinstance(existing_data, list):
-                    # Convert old format to new format
-                    metadata = {'documents': {}, 'chunks': existing_data}
-                    # Try to extract document info from chunks
-                    for chunk in existing_data:
-                        if 'doc' in chunk:
-                            doc_name = chunk['doc']
-                            doc_id = hashlib.md5(doc_name.encode()).hexdigest()
-                            if doc_id not in metadata['documents']:
-                                metadata['documents'][doc_id] = {
-                                    'doc_id': doc_id,
-                                    'title': doc_name,
-                                    'file_path': f"documents/{doc_name}",
-                                    'added_date': str(time.time()),
-                                    'chunk_count': 0,
-                                    'file_size': 0,
-                                    'doc_type': '.pdf'
-                                }
-                else:
-                    metadata = existing_data
-
-            documents = []
-            for doc_data in metadata.get('documents', {}).values():
-                documents.append(DocumentInfo(**doc_data))
-
-            return documents
-
+            return [DocumentInfo(**doc_data) for doc_data in self.store.list_documents()]
         except Exception as e:
-            print(f"Error listing documents: {e}")
+            echo(f"Error listing documents: {e}")
             return []
     
     def remove_document(self, doc_id: str) -> bool:
         """Remove a document from the knowledge base."""
         try:
-            metadata_file = self.index_dir / "metadata.json"
-            
-            if not metadata_file.exists():
-                return False
-            
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-            
-            # Remove document
-            if doc_id not in metadata.get('documents', {}):
+            doc_info = self.store.remove_document(doc_id)
+            if doc_info is None:
                 return False
             
-            doc_info = metadata['documents'][doc_id]
-            del metadata['documents'][doc_id]
-            
-            # Remove chunks
-            metadata['chunks'] = [
-                chunk for chunk in metadata['chunks'] 
-                if chunk.get('doc_id') != doc_id
-            ]
-            
-            # Save updated metadata
-            with open(metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2, ensure_ascii=False)
-            
             # Remove file if it exists
             try:
                 file_path = Path(doc_info['file_path'])
@@ -294,9 +273,9 @@ class DocumentProcessor:
             except Exception:
                 pass  # File removal is not critical
             
-            print(f"Successfully removed document: {doc_id}")
+            echo(f"Successfully removed document: {doc_id}")
             return True
             
         except Exception as e:
-            print(f"Error removing document: {e}")
+            echo(f"Error removing document: {e}")
             return False
@@ -0,0 +1,173 @@
+"""Embedding client for BabyCare RAG system."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Sequence
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+# Vectors from /api/embed are unit-length, so the legacy endpoint's output is
+# normalized the same way. Stored vectors are tagged with this format so that
+# caches never mix the two.
+EMBEDDING_FORMAT = "l2norm-v1"
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows of a 2-D array."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def index_is_normalized(index, sample: int = 64) -> bool:
+    """Check whether an index holds unit-length vectors.
+
+    Indexes built before embeddings were normalized must be rebuilt, since
+    their distances are not comparable with normalized query vectors.
+    Returns True when the index cannot be inspected.
+    """
+    try:
+        n = min(sample, index.ntotal)
+        if n == 0:
+            return True
+        if hasattr(index, "id_map"):
+            # Id-mapped indexes reconstruct by id; read positions from the inner index
+            import faiss
+            index = faiss.downcast_index(index.index)
+        vectors = index.reconstruct_n(0, n)
+        return bool(np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-3))
+    except Exception:
+        return True
+
+
+def _is_model_error(response: requests.Response) -> bool:
+    """Whether a 404 reports a missing model rather than a missing endpoint."""
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    error = body.get("error") if isinstance(body, dict) else None
+    return isinstance(error, str) and "model" in error.lower()
+
+
+class OllamaEmbeddingClient:
+    """Batched, pooled and retrying client for Ollama embeddings.
+
+    Uses the batch ``/api/embed`` endpoint and falls back to one request per
+    text on ``/api/embeddings`` for Ollama versions without it. Batches are
+    sent concurrently over a shared keep-alive connection pool.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        batch_size: int = 32,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 60.0
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._batch_supported: Optional[bool] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _post(self, path: str, payload: dict) -> requests.Response:
+        """POST with exponential backoff on connection errors and 429/5xx."""
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+                if response.status_code not in _RETRY_STATUS or attempt == self.max_retries:
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+            time.sleep(self.backoff * (2 ** attempt))
+        raise RuntimeError("unreachable")
+
+    def _embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        if self._batch_supported is not False:
+            response = self._post("/api/embed", {"model": self.model, "input": list(texts)})
+            if response.status_code == 404 and self._batch_supported is None \
+                    and not _is_model_error(response):
+                # Older Ollama without the batch endpoint
+                self._batch_supported = False
+            else:
+                response.raise_for_status()
+                self._batch_supported = True
+                return normalize(np.array(response.json()["embeddings"], dtype=np.float32))
+
+        vectors = []
+        for text in texts:
+            response = self._post("/api/embeddings", {"model": self.model, "prompt": text})
+            response.raise_for_status()
+            vectors.append(response.json()["embedding"])
+        return normalize(np.array(vectors, dtype=np.float32))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="embed"
+                )
+            return self._executor
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts in batches; returns an (n, dim) float32 array in input order."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1 or self.max_concurrency == 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            results = list(self._get_executor().map(self._embed_batch, batches))
+        return np.vstack(results)
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a single text."""
+        return self.embed_many([text])[0]
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+        self.session.close()
+
+
+@lru_cache(maxsize=None)
+def shared_client(
+    base_url: str,
+    model: str,
+    batch_size: int = 32,
+    max_concurrency: int = 4,
+    max_retries: int = 3
+) -> OllamaEmbeddingClient:
+    """Process-wide client per endpoint and settings, so connections are reused."""
+    return OllamaEmbeddingClient(
+        base_url, model,
+        batch_size=batch_size,
+        max_concurrency=max_concurrency,
+        max_retries=max_retries
+    )
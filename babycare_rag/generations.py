@@ -0,0 +1,119 @@
+"""Index generations and the manifest pointing at the live one."""
+
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+
+from .vector_index import write_index
+
+MANIFEST_NAME = "manifest.json"
+
+
+class IndexGenerations:
+    """Immutable index generations under ``index_dir/generations/<n>``.
+
+    A rebuild writes a complete new generation directory and only then
+    replaces ``manifest.json`` by rename, so readers see either the old or
+    the new generation, never a half-written one. A crash before the flip
+    leaves the previous generation live. The newest ``keep`` generations are
+    kept for readers still holding older ones.
+
+    Small changes are not written as generations: the writer records the
+    store generation it has applied (``applied_store_generation``) in the
+    manifest, and readers add the documents changed since the generation's
+    ``store_generation`` as a delta next to the live index.
+    """
+
+    def __init__(self, index_dir: Path, keep: int = 2):
+        self.index_dir = Path(index_dir)
+        self.generations_dir = self.index_dir / "generations"
+        self.manifest_file = self.index_dir / MANIFEST_NAME
+        self.keep = max(1, keep)
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """Manifest of the live generation, or None if there is no index.
+
+        An index.bin from before generations existed is served as
+        generation 0.
+        """
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+        if (self.index_dir / "index.bin").exists():
+            return {"generation": 0, "index": "index.bin", "store_generation": None}
+        return None
+
+    def index_path(self, manifest: Dict[str, Any]) -> Path:
+        return self.index_dir / manifest["index"]
+
+    def signature(self) -> Optional[Tuple[int, int]]:
+        """Cheap change check: (mtime_ns, size) of the manifest."""
+        try:
+            stat = self.manifest_file.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _claim_directory(self) -> Tuple[int, Path]:
+        """Create the next generation directory; mkdir makes the claim atomic."""
+        self.generations_dir.mkdir(parents=True, exist_ok=True)
+        while True:
+            existing = [int(p.name) for p in self.generations_dir.iterdir() if p.name.isdigit()]
+            generation = max(existing, default=0) + 1
+            path = self.generations_dir / f"{generation:06d}"
+            try:
+                path.mkdir()
+                return generation, path
+            except FileExistsError:
+                continue
+
+    def publish(self, index: faiss.Index, store_generation: Optional[int] = None) -> Dict[str, Any]:
+        """Write the index as a new generation and make it live."""
+        generation, path = self._claim_directory()
+        write_index(index, path / "index.bin")
+        manifest = {
+            "generation": generation,
+            "index": str((path / "index.bin").relative_to(self.index_dir)),
+            "store_generation": store_generation,
+            "applied_store_generation": store_generation,
+            "vectors": int(index.ntotal),
+            "created": time.time()
+        }
+        self._write_manifest(manifest)
+
+        self._cleanup(generation)
+        return manifest
+
+    def mark_applied(self, generation: int, store_generation: int) -> Optional[Dict[str, Any]]:
+        """Record that changes up to ``store_generation`` are applied as a delta to ``generation``.
+
+        Returns None, without writing, if another writer has published a
+        newer generation in the meantime.
+        """
+        current = self.current()
+        if current is None or current["generation"] != generation:
+            return None
+        manifest = dict(current, applied_store_generation=store_generation)
+        self._write_manifest(manifest)
+        return manifest
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        tmp_file = self.manifest_file.with_name(f".{MANIFEST_NAME}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    def _cleanup(self, live: int):
+        """Delete generations older than the newest ``keep`` (never the live one)."""
+        generations = sorted(int(p.name) for p in self.generations_dir.iterdir() if p.name.isdigit())
+        for generation in generations[:-self.keep]:
+            if generation != live:
+                # Memory-mapped readers keep their pages after the files are unlinked
+                shutil.rmtree(self.generations_dir / f"{generation:06d}", ignore_errors=True)
@@ -0,0 +1,286 @@
+"""Streaming ingestion pipeline for BabyCare RAG system."""
+
+import contextlib
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .change_detection import check_file
+from .conversion import convert_files
+from .document_processor import DocumentProcessor
+from .metadata_store import legacy_doc_id
+from .output import echo
+from .models import IngestReport
+from .search_engine import SearchEngine
+from .vector_index import chunk_text, chunk_vector_id
+
+# End of a stage's output
+_DONE = object()
+
+
+@contextlib.contextmanager
+def _sync_lock(lock_file: Path):
+    """Exclusive lock across processes syncing the same directory (POSIX only)."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(lock_file, 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class _Cancelled(Exception):
+    """Raised inside a stage when another stage has failed."""
+
+
+class IngestPipeline:
+    """Convert → chunk → embed with bounded queues between stages, then one index update.
+
+    Each stage runs in its own thread, so PDF parsing (in worker processes)
+    overlaps with embedding requests. The embed stage stores vectors in the
+    engine's embedding cache rather than holding them; the queues are
+    bounded, so a slow stage holds back the ones before it. The index is
+    updated once at the end: small change sets become a delta, larger ones
+    are compacted or rebuilt from the cached vectors batch by batch. Memory
+    for pending documents and vectors therefore stays bounded by the queue
+    and batch sizes, whatever the size of the library being ingested.
+    """
+
+    def __init__(self, processor: DocumentProcessor, engine: SearchEngine, queue_size: int = 4):
+        self.processor = processor
+        self.engine = engine
+        self.queue_size = queue_size
+        config = engine.config
+        self.workers = config.ingest_workers
+        # One batch keeps every concurrent embedding request busy
+        self.batch_size = config.embed_batch_size * config.embed_concurrency
+        self._stop = threading.Event()
+
+    def _put(self, q: queue.Queue, item: Any):
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._stop.is_set():
+                    raise _Cancelled()
+
+    def _get(self, q: queue.Queue) -> Iterator[Any]:
+        while True:
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    raise _Cancelled()
+                continue
+            if item is _DONE:
+                return
+            yield item
+
+    def _run_stage(self, stage: Callable[[], None], output: queue.Queue, errors: List[Exception]):
+        try:
+            stage()
+        except _Cancelled:
+            pass
+        except Exception as e:
+            errors.append(e)
+            self._stop.set()
+        finally:
+            try:
+                self._put(output, _DONE)
+            except _Cancelled:
+                pass
+
+    def sync(self, directory: Path, state_file: Path) -> IngestReport:
+        """Bring the index in line with the files in a directory.
+        
+        Deleted files are removed from the metadata store; new and changed
+        files (by size/mtime, confirmed by content hash) are ingested, and
+        the index is updated once. Per-file state is kept in ``state_file``.
+        A file without state whose document is already stored with the same
+        size and mtime (added by another process) is not ingested again.
+        Documents imported from the legacy metadata.json under the file's
+        name are replaced by the file.
+        """
+        directory = Path(directory)
+        state_file = Path(state_file)
+        with _sync_lock(state_file.with_name(f".{state_file.name}.lock")):
+            state = json.loads(state_file.read_text()) if state_file.exists() else {}
+            
+            stored: Dict[str, List[Dict[str, Any]]] = {}
+            for doc in self.processor.store.list_documents():
+                stored.setdefault(Path(doc['file_path']).name, []).append(doc)
+            
+            files = sorted(p for p in directory.glob("*.*") if p.is_file())
+            names = {file.name for file in files}
+            
+            deleted = sorted((set(state) | set(stored)) - names)
+            for name in deleted:
+                echo(f"Removing deleted file: {name}")
+                state.pop(name, None)
+                for doc in stored.get(name, []):
+                    self.processor.store.remove_document(doc['doc_id'])
+            
+            changed: List[Tuple[Path, Dict[str, Any]]] = []
+            for file in files:
+                is_changed, entry = check_file(file, state.get(file.name))
+                doc_id = self.processor.doc_id_for(file)
+                docs = stored.get(file.name, [])
+                for doc in docs:
+                    if doc['doc_id'] != doc_id and doc['doc_id'] == legacy_doc_id(file.name):
+                        self.processor.store.remove_document(doc['doc_id'])
+                current = next((doc for doc in docs if doc['doc_id'] == doc_id), None)
+                if current is not None and file.name not in state:
+                    stat = file.stat()
+                    is_changed = current.get('file_size') != stat.st_size \
+                        or current.get('added_date') != str(stat.st_mtime)
+                if is_changed or current is None:
+                    changed.append((file, entry))
+                else:
+                    state[file.name] = entry
+            
+            if changed:
+                # The hashes check_file computed spare the converter from reading the files again
+                report = self.run([file for file, _ in changed],
+                                  {file: entry["hash"] for file, entry in changed})
+            else:
+                report = IngestReport(
+                    documents_processed=0, chunks_indexed=0, elapsed_seconds=0.0,
+                    docs_per_second=0.0, chunks_per_second=0.0
+                )
+            if not report.documents_processed and (deleted or changed):
+                # Nothing new to add, but removals must reach the index
+                self.engine.update_index()
+            
+            failed = set(report.documents_failed)
+            for file, entry in changed:
+                if str(file) not in failed:
+                    state[file.name] = entry
+            
+            tmp_file = state_file.with_name(f".{state_file.name}.{os.getpid()}.tmp")
+            tmp_file.write_text(json.dumps(state, indent=2))
+            os.replace(tmp_file, state_file)
+            return report
+    
+    def run(self, paths: Iterable[Path], file_hashes: Optional[Dict[Path, str]] = None) -> IngestReport:
+        """Ingest files and update the index once at the end.
+        
+        ``file_hashes`` holds content digests (hash_file) already computed
+        for some of the paths.
+        """
+        start = time.perf_counter()
+        self._stop.clear()
+        converted: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        chunked: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        embedded: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        failed: List[str] = []
+        errors: List[Exception] = []
+        counts = {'documents': 0, 'chunks': 0}
+
+        # Embeddings land in the engine's embedding cache; the single index
+        # update at the end reads them from there
+        seen = set()
+
+        # Digests by imported path; import_file may copy a file elsewhere
+        known_hashes: Dict[Path, str] = {}
+
+        def imported() -> Iterator[Path]:
+            for path in paths:
+                try:
+                    imported_path = self.processor.import_file(path)
+                except Exception as e:
+                    echo(f"Error adding document from file: {e}")
+                    failed.append(str(path))
+                    continue
+                if file_hashes and path in file_hashes:
+                    known_hashes[imported_path] = file_hashes[path]
+                yield imported_path
+
+        def convert():
+            for conversion in convert_files(imported(), self.workers, self.processor.markdown_cache_dir,
+                                            known_hashes, self.processor.markdown_cache_max_bytes):
+                self._put(converted, conversion)
+
+        def chunk():
+            batch: List[Tuple[int, str]] = []
+            for conversion in self._get(converted):
+                if conversion.error is not None:
+                    echo(f"Error processing document {conversion.path}: {conversion.error}")
+                    failed.append(str(conversion.path))
+                    continue
+                try:
+                    chunks = self.processor.store_document(conversion.path, conversion.text)
+                except Exception as e:
+                    echo(f"Error processing document {conversion.path}: {e}")
+                    failed.append(str(conversion.path))
+                    continue
+                counts['documents'] += 1
+                counts['chunks'] += len(chunks)
+                for c in chunks:
+                    vector_id = chunk_vector_id(c)
+                    if vector_id not in seen:
+                        seen.add(vector_id)
+                        batch.append((vector_id, chunk_text(c)))
+                while len(batch) >= self.batch_size:
+                    self._put(chunked, batch[:self.batch_size])
+                    batch = batch[self.batch_size:]
+            if batch:
+                self._put(chunked, batch)
+
+        def embed():
+            for batch in self._get(chunked):
+                vectors = self.engine.embed_texts([text for _, text in batch])
+                self._put(embedded, len(vectors))
+
+        threads = [
+            threading.Thread(target=self._run_stage, args=(stage, output, errors),
+                             name=f"ingest-{stage.__name__}", daemon=True)
+            for stage, output in ((convert, converted), (chunk, chunked), (embed, embedded))
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for _ in self._get(embedded):
+                pass
+        except _Cancelled:
+            pass
+        except Exception as e:
+            errors.append(e)
+            self._stop.set()
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            echo(f"Ingest stopped early: {errors[0]}")
+
+        # Update the index once; all embeddings are cached by now, and the
+        # update reads them back in embedding-sized batches
+        if counts['documents']:
+            self.engine.update_index()
+
+        elapsed = time.perf_counter() - start
+        report = IngestReport(
+            documents_processed=counts['documents'],
+            documents_failed=failed,
+            chunks_indexed=counts['chunks'],
+            elapsed_seconds=round(elapsed, 3),
+            docs_per_second=round(counts['documents'] / elapsed, 2) if elapsed else 0.0,
+            chunks_per_second=round(counts['chunks'] / elapsed, 2) if elapsed else 0.0
+        )
+        echo(
+            f"Ingested {report.documents_processed} documents ({report.chunks_indexed} chunks) "
+            f"in {report.elapsed_seconds:.1f}s: {report.docs_per_second:.2f} docs/s, "
+            f"{report.chunks_per_second:.1f} chunks/s"
+        )
+        return report
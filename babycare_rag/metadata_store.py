@@ -0,0 +1,386 @@
+"""SQLite metadata store for BabyCare RAG system."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .output import echo
+from .vector_index import chunk_key, chunk_vector_id
+
+_DOCUMENT_FIELDS = ("doc_id", "title", "file_path", "added_date", "chunk_count", "file_size", "doc_type")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    added_date TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL DEFAULT 0,
+    file_size INTEGER,
+    doc_type TEXT
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    chunk_id TEXT NOT NULL,
+    doc_id TEXT,
+    vector_id INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_doc_id ON chunks (doc_id);
+CREATE INDEX IF NOT EXISTS idx_chunks_chunk_id ON chunks (chunk_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    generation INTEGER NOT NULL,
+    doc_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_changes_generation ON changes (generation);
+"""
+
+# Change log entries kept; readers further behind reload everything
+_MAX_CHANGES = 10000
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_BATCH = 500
+
+
+def legacy_doc_id(doc_name: str) -> str:
+    """Document id used for chunks from the legacy array format."""
+    return hashlib.md5(doc_name.encode()).hexdigest()
+
+
+def chunk_doc_id(chunk: Dict[str, Any]) -> Optional[str]:
+    """Document id a chunk is stored under in either metadata format."""
+    if chunk.get('doc_id'):
+        return chunk['doc_id']
+    return legacy_doc_id(chunk['doc']) if 'doc' in chunk else None
+
+
+@dataclass
+class StoreChanges:
+    """Documents changed between two store generations.
+
+    ``documents`` maps each changed doc_id to its current row, or None if it
+    was removed; ``chunks`` holds the current chunks of the changed documents
+    in insertion order.
+    """
+    generation: int
+    documents: Dict[str, Optional[Dict[str, Any]]]
+    chunks: List[Dict[str, Any]]
+
+
+class MetadataStore:
+    """Documents and chunks in SQLite, updated one document at a time.
+
+    Adding or removing a document touches only that document's rows inside a
+    single transaction, instead of rewriting the whole metadata file. Chunks
+    keep their insertion order (``seq``), which defines their position in the
+    search engine. Every change is logged with its generation, so readers can
+    catch up by fetching only the documents changed since they last read.
+    """
+
+    def __init__(self, path: Path, legacy_json: Optional[Path] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            # Changes before the log existed are unknown
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) "
+                "SELECT 'changes_floor', COALESCE((SELECT value FROM meta WHERE key = 'generation'), '0')"
+            )
+
+        if legacy_json is not None:
+            if self._get_meta("initialized") is None:
+                self.import_legacy_json(legacy_json)
+            elif self._legacy_stamp(Path(legacy_json)) not in (None, self._get_meta("legacy_stamp")):
+                # Rewritten since the import (older MCP servers kept writing it)
+                self.resync_legacy_json(legacy_json)
+
+    @classmethod
+    def for_index_dir(cls, index_dir: Path) -> "MetadataStore":
+        """Store at index_dir/metadata.db, importing metadata.json on first use."""
+        index_dir = Path(index_dir)
+        return cls(index_dir / "metadata.db", legacy_json=index_dir / "metadata.json")
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    @staticmethod
+    def _set_meta(conn: sqlite3.Connection, key: str, value: str):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    @staticmethod
+    def _legacy_stamp(metadata_file: Path) -> Optional[str]:
+        try:
+            stat = metadata_file.stat()
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    @staticmethod
+    def _bump_generation(conn: sqlite3.Connection, doc_ids: List[Optional[str]]):
+        """Advance the generation and log the changed documents (None: everything changed)."""
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('generation', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+        generation = int(conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+        conn.executemany(
+            "INSERT INTO changes (generation, doc_id) VALUES (?, ?)",
+            [(generation, doc_id) for doc_id in doc_ids]
+        )
+
+        oldest = conn.execute(
+            "SELECT generation FROM changes ORDER BY generation DESC LIMIT 1 OFFSET ?", (_MAX_CHANGES,)
+        ).fetchone()
+        if oldest is not None:
+            conn.execute("DELETE FROM changes WHERE generation <= ?", (oldest[0],))
+            MetadataStore._set_meta(conn, 'changes_floor', str(oldest[0]))
+
+    @staticmethod
+    def _insert_chunks(conn: sqlite3.Connection, doc_id: Optional[str], chunks: List[Dict[str, Any]]):
+        conn.executemany(
+            "INSERT INTO chunks (chunk_id, doc_id, vector_id, data) VALUES (?, ?, ?, ?)",
+            [
+                (chunk_key(chunk), chunk.get('doc_id') or doc_id, chunk_vector_id(chunk),
+                 json.dumps(chunk, ensure_ascii=False))
+                for chunk in chunks
+            ]
+        )
+
+    @staticmethod
+    def _insert_document(conn: sqlite3.Connection, doc: Dict[str, Any]):
+        conn.execute(
+            f"INSERT OR REPLACE INTO documents ({', '.join(_DOCUMENT_FIELDS)}) "
+            f"VALUES ({', '.join('?' * len(_DOCUMENT_FIELDS))})",
+            [doc.get(field) for field in _DOCUMENT_FIELDS]
+        )
+
+    @staticmethod
+    def _read_legacy_json(metadata_file: Path) -> Any:
+        if not metadata_file.exists():
+            return None
+        with open(metadata_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _legacy_documents(chunks: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Documents of the old array format, derived from each chunk's file name."""
+        documents: Dict[str, Dict[str, Any]] = {}
+        for chunk in chunks:
+            if 'doc' not in chunk:
+                continue
+            doc_id = legacy_doc_id(chunk['doc'])
+            doc = documents.setdefault(doc_id, {
+                'doc_id': doc_id,
+                'title': chunk['doc'],
+                'file_path': f"documents/{chunk['doc']}",
+                'added_date': str(time.time()),
+                'chunk_count': 0,
+                'file_size': 0,
+                'doc_type': Path(chunk['doc']).suffix.lower() or '.pdf'
+            })
+            doc['chunk_count'] += 1
+        return documents
+
+    def import_legacy_json(self, metadata_file: Path) -> int:
+        """One-time import of metadata.json (array or object format).
+
+        Returns the number of imported chunks.
+        """
+        metadata_file = Path(metadata_file)
+        data = self._read_legacy_json(metadata_file)
+
+        documents: Dict[str, Dict[str, Any]] = {}
+        chunks: List[Dict[str, Any]] = []
+        if isinstance(data, list):
+            chunks = data
+            documents = self._legacy_documents(chunks)
+        elif isinstance(data, dict):
+            documents = data.get('documents', {})
+            chunks = data.get('chunks', [])
+
+        with self._lock, self._conn:
+            if self._conn.execute("SELECT value FROM meta WHERE key = 'initialized'").fetchone():
+                return 0
+            for doc in documents.values():
+                self._insert_document(self._conn, doc)
+            for chunk in chunks:
+                self._insert_chunks(self._conn, chunk_doc_id(chunk), [chunk])
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('initialized', ?)",
+                (str(metadata_file) if data is not None else "empty",)
+            )
+            self._set_meta(self._conn, 'legacy_stamp', self._legacy_stamp(metadata_file) or "")
+            self._bump_generation(self._conn, [None])
+
+        if data is not None:
+            echo(f"Imported {len(documents)} documents and {len(chunks)} chunks from {metadata_file}")
+        return len(chunks)
+
+    def resync_legacy_json(self, metadata_file: Path) -> int:
+        """Re-import array-format documents from a metadata.json rewritten after the import.
+
+        Documents under legacy ids (and chunks without a document) are
+        replaced by the file's contents. Files already stored under another
+        id are left to that document. Returns the number of imported chunks.
+        """
+        metadata_file = Path(metadata_file)
+        stamp = self._legacy_stamp(metadata_file)
+        data = self._read_legacy_json(metadata_file)
+        if not isinstance(data, list):
+            # Only the MCP server's array format was written after the import
+            with self._lock, self._conn:
+                self._set_meta(self._conn, 'legacy_stamp', stamp or "")
+            return 0
+        chunks = data
+        documents = self._legacy_documents(chunks)
+
+        with self._lock, self._conn:
+            names = {
+                Path(row["file_path"]).name for row in self._conn.execute("SELECT doc_id, file_path FROM documents")
+                if row["doc_id"] != legacy_doc_id(Path(row["file_path"]).name)
+            }
+            documents = {doc_id: doc for doc_id, doc in documents.items() if doc['title'] not in names}
+            chunks = [chunk for chunk in chunks if chunk_doc_id(chunk) is None or chunk_doc_id(chunk) in documents]
+
+            stale = [
+                row["doc_id"] for row in self._conn.execute("SELECT doc_id, file_path FROM documents")
+                if row["doc_id"] == legacy_doc_id(Path(row["file_path"]).name)
+            ]
+            self._conn.executemany("DELETE FROM chunks WHERE doc_id = ?", [(doc_id,) for doc_id in stale])
+            self._conn.executemany("DELETE FROM documents WHERE doc_id = ?", [(doc_id,) for doc_id in stale])
+            self._conn.execute("DELETE FROM chunks WHERE doc_id IS NULL")
+            for doc in documents.values():
+                self._insert_document(self._conn, doc)
+            for chunk in chunks:
+                self._insert_chunks(self._conn, chunk_doc_id(chunk), [chunk])
+            self._set_meta(self._conn, 'legacy_stamp', stamp or "")
+            self._bump_generation(self._conn, [None])
+
+        echo(f"Re-imported {len(documents)} documents and {len(chunks)} chunks from {metadata_file}")
+        return len(chunks)
+
+    def add_document(self, doc: Dict[str, Any], chunks: List[Dict[str, Any]]):
+        """Insert or replace a document and all of its chunks in one transaction."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc['doc_id'],))
+            self._insert_document(self._conn, doc)
+            self._insert_chunks(self._conn, doc['doc_id'], chunks)
+            self._bump_generation(self._conn, [doc['doc_id']])
+
+    def remove_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Delete a document and its chunks; returns the removed document or None."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            self._bump_generation(self._conn, [doc_id])
+        return dict(row)
+
+    def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_documents(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM documents ORDER BY rowid").fetchall()
+        return [dict(row) for row in rows]
+
+    def documents_by_id(self) -> Dict[str, Dict[str, Any]]:
+        return {doc['doc_id']: doc for doc in self.list_documents()}
+
+    def all_chunks(self) -> List[Dict[str, Any]]:
+        """Every chunk in insertion order."""
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM chunks ORDER BY seq").fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def get_chunks(self, chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Chunks by id (``chunk_key``); ids that are not stored are left out."""
+        chunk_ids = list(chunk_ids)
+        found: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for start in range(0, len(chunk_ids), _QUERY_BATCH):
+                batch = chunk_ids[start:start + _QUERY_BATCH]
+                for row in self._conn.execute(
+                    f"SELECT chunk_id, data FROM chunks WHERE chunk_id IN ({', '.join('?' * len(batch))})",
+                    batch
+                ):
+                    found[row["chunk_id"]] = json.loads(row["data"])
+        return found
+
+    def changes_since(self, generation: Optional[int]) -> Optional[StoreChanges]:
+        """Documents changed after ``generation``, read in one transaction.
+
+        Returns None when a full reload is needed instead: ``generation`` is
+        unknown or older than the change log, or everything was replaced
+        (legacy import) in between.
+        """
+        if generation is None:
+            return None
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                meta = dict(self._conn.execute(
+                    "SELECT key, value FROM meta WHERE key IN ('generation', 'changes_floor')"
+                ).fetchall())
+                current = int(meta.get('generation', 0))
+                floor = int(meta.get('changes_floor', 0))
+                if generation < floor or generation > current:
+                    return None
+                doc_ids = [row["doc_id"] for row in self._conn.execute(
+                    "SELECT DISTINCT doc_id FROM changes WHERE generation > ?", (generation,)
+                )]
+                if None in doc_ids:
+                    return None
+                documents: Dict[str, Optional[Dict[str, Any]]] = dict.fromkeys(doc_ids)
+                for row in self._conn.execute(
+                    "SELECT * FROM documents WHERE doc_id IN "
+                    "(SELECT doc_id FROM changes WHERE generation > ?)", (generation,)
+                ):
+                    documents[row["doc_id"]] = dict(row)
+                chunks = [json.loads(row["data"]) for row in self._conn.execute(
+                    "SELECT data FROM chunks WHERE doc_id IN "
+                    "(SELECT doc_id FROM changes WHERE generation > ?) ORDER BY seq", (generation,)
+                )]
+            finally:
+                self._conn.execute("COMMIT")
+        return StoreChanges(generation=current, documents=documents, chunks=chunks)
+
+    def count_documents(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def count_chunks(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def generation(self) -> int:
+        """Counter incremented by every committed change."""
+        return int(self._get_meta("generation") or 0)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
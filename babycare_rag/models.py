@@ -51,6 +51,27 @@ class SystemStats(BaseModel):
     llm_model: str = Field(description="Current LLM model")
 
 
+class AddDocumentResult(BaseModel):
+    """Outcome of adding one item in a bulk add."""
+    
+    source: str = Field(description="File path or title of the item")
+    success: bool = Field(description="Whether the item was added")
+    doc_id: Optional[str] = Field(default=None, description="Document identifier if added")
+    chunk_count: int = Field(default=0, description="Number of chunks stored")
+    error: Optional[str] = Field(default=None, description="Error message if failed")
+
+
+class IngestReport(BaseModel):
+    """Outcome and throughput of a directory ingest."""
+    
+    documents_processed: int = Field(description="Documents converted, chunked and indexed")
+    documents_failed: List[str] = Field(default_factory=list, description="Files that could not be ingested")
+    chunks_indexed: int = Field(description="Chunks stored and embedded")
+    elapsed_seconds: float = Field(description="Wall-clock time of the ingest")
+    docs_per_second: float = Field(description="Document throughput")
+    chunks_per_second: float = Field(description="Chunk throughput")
+
+
 class MemoryItem(BaseModel):
     """Memory item for the RAG system."""
     
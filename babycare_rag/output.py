@@ -0,0 +1,21 @@
+"""Progress output for BabyCare RAG system."""
+
+import sys
+from typing import Optional, TextIO
+
+_stream: Optional[TextIO] = None
+
+
+def set_output(stream: Optional[TextIO]):
+    """Send progress messages to ``stream`` (None: sys.stdout).
+
+    Processes whose stdout carries a protocol, such as the MCP server, point
+    this at stderr once at startup instead of swapping sys.stdout.
+    """
+    global _stream
+    _stream = stream
+
+
+def echo(*args, **kwargs):
+    """print() to the progress stream."""
+    print(*args, file=_stream or sys.stdout, **kwargs)
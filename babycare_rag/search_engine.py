@@ -1,37 +1,172 @@
 """Search engine module for BabyCare RAG system."""
 
 import json
-import math
 import re
+import threading
+from collections import ChainMap
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
-from collections import Counter, defaultdict
+from typing import List, Dict, Any, FrozenSet, Mapping, Optional, Tuple
 import faiss
 import numpy as np
-import requests
-from tqdm import tqdm
 
+from .bm25 import BM25Index
 from .config import RAGConfig
+from .embedding_cache import EmbeddingCache
+from .embeddings import EMBEDDING_FORMAT, index_is_normalized, shared_client
+from .generations import IndexGenerations
+from .metadata_store import MetadataStore, StoreChanges, chunk_doc_id
+from .output import echo
 from .models import SearchResult
+from .vector_index import (
+    build_index, chunk_text, chunk_vector_ids, configure_search, id_positions,
+    index_ids, index_type_of, is_id_mapped, read_index, supports_remove,
+    to_id_index
+)
+
+# IVF training sample per cluster (FAISS subsamples above 256 points per centroid)
+_TRAIN_POINTS_PER_CLUSTER = 256
+
+
+def _apply_changes(metadata: Dict[str, Any], documents: Dict[str, Optional[Dict[str, Any]]],
+                   chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Metadata with changed documents replaced (None: removed) by their current chunks."""
+    merged = dict(metadata.get('documents', {}))
+    for doc_id, doc in documents.items():
+        if doc is None:
+            merged.pop(doc_id, None)
+        else:
+            merged[doc_id] = doc
+    # Changed documents' chunks move to the end, as in the store's insertion order
+    kept = [chunk for chunk in metadata.get('chunks', []) if chunk_doc_id(chunk) not in documents]
+    return {'documents': merged, 'chunks': kept + list(chunks)}
+
+
+@dataclass(frozen=True)
+class DeltaSegment:
+    """Documents changed since a generation was built, searched next to its index.
+    
+    Base positions of the changed documents are hidden (``removed``) and
+    their current chunks are searched in a small exact index and a BM25
+    index scored with the base's term statistics.
+    """
+    store_generation: int
+    documents: Dict[str, Optional[Dict[str, Any]]]
+    chunks: List[Dict[str, Any]]
+    index: Optional[faiss.Index]
+    bm25: BM25Index
+    removed: FrozenSet[int]
+    
+    @property
+    def size(self) -> int:
+        """Chunks added plus base chunks hidden, i.e. the work left for compaction."""
+        return len(self.chunks) + len(self.removed)
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """One generation of the index with the metadata and lookups built for it.
+    
+    Searches read the current snapshot once, so swapping in a new one never
+    affects a search that is already running. Search positions below
+    ``base_size`` are base chunks, the rest are delta chunks.
+    """
+    generation: int
+    index: Optional[faiss.Index]
+    metadata: Dict[str, Any]
+    bm25: BM25Index
+    id_positions: Dict[int, int]
+    # Metadata store generation the index was built for
+    store_generation: Optional[int] = None
+    # Base positions of each document's chunks
+    doc_positions: Dict[Optional[str], List[int]] = field(default_factory=dict)
+    delta: Optional[DeltaSegment] = None
+    # A memory-mapped index is read-only and must be copied before updates
+    mmapped: bool = False
+    
+    @property
+    def base_size(self) -> int:
+        return len(self.metadata.get('chunks', []))
+    
+    @property
+    def size(self) -> int:
+        """Number of searchable chunks."""
+        if self.delta is None:
+            return self.base_size
+        return self.base_size - len(self.delta.removed) + len(self.delta.chunks)
+    
+    @property
+    def documents(self) -> Mapping[str, Dict[str, Any]]:
+        documents = self.metadata.get('documents', {})
+        if self.delta is None:
+            return documents
+        return ChainMap({doc_id: doc for doc_id, doc in self.delta.documents.items() if doc}, documents)
+    
+    def chunk(self, position: int) -> Optional[Dict[str, Any]]:
+        chunks = self.metadata.get('chunks', [])
+        if position < len(chunks):
+            return chunks[position]
+        if self.delta is not None and position - len(chunks) < len(self.delta.chunks):
+            return self.delta.chunks[position - len(chunks)]
+        return None
+    
+    def live_metadata(self) -> Dict[str, Any]:
+        """Documents and chunks including the delta (copies the chunk list when there is one)."""
+        if self.delta is None:
+            return self.metadata
+        return _apply_changes(self.metadata, self.delta.documents, self.delta.chunks)
 
 
 class SearchEngine:
     """Hybrid search engine combining BM25 and vector search."""
     
-    def __init__(self, config: RAGConfig):
+    def __init__(self, config: RAGConfig, store: Optional[MetadataStore] = None):
         self.config = config
         self.index_dir = Path(config.index_dir)
-        self.embedding_url = f"{config.ollama_base_url.rstrip('/')}/api/embeddings"
+        self.store = store or MetadataStore.for_index_dir(self.index_dir)
         self.embed_model = config.embed_model
+        self.embedder = shared_client(
+            config.ollama_base_url,
+            config.embed_model,
+            batch_size=config.embed_batch_size,
+            max_concurrency=config.embed_concurrency,
+            max_retries=config.embed_max_retries
+        )
+        # Cache namespace: model plus vector format
+        self.embed_cache_model = f"{config.embed_model}@{EMBEDDING_FORMAT}"
         
         # Load synonyms for query expansion
         self.synonyms = self._load_synonyms()
         
+        # Chunk embeddings already computed, stored next to index.bin
+        self.embedding_cache = EmbeddingCache(self.index_dir / "embeddings.sqlite")
+        
         # Initialize search components
-        self.faiss_index = None
-        self.metadata = None
+        self.generations = IndexGenerations(self.index_dir)
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._manifest_signature = None
+        self._reload_lock = threading.Lock()
+        # Serializes index writers (updates and rebuilds)
+        self._write_lock = threading.RLock()
+        self._rebuild_executor: Optional[ThreadPoolExecutor] = None
+        self._rebuild_lock = threading.Lock()
+        # Rebuild started because the loaded index holds unnormalized vectors
+        self._normalize_rebuild: Optional["Future[bool]"] = None
         self._load_index()
     
+    @property
+    def faiss_index(self) -> Optional[faiss.Index]:
+        return self._snapshot.index if self._snapshot else None
+    
+    @property
+    def metadata(self) -> Optional[Dict[str, Any]]:
+        return self._snapshot.live_metadata() if self._snapshot else None
+    
+    @property
+    def bm25_index(self) -> Optional[BM25Index]:
+        return self._snapshot.bm25 if self._snapshot else None
+    
     def _load_synonyms(self) -> Dict[str, List[str]]:
         """Load synonyms for query expansion."""
         synonyms_file = Path("babycare_synonyms.json")
@@ -53,47 +188,169 @@ class SearchEngine:
             "safety": ["secure", "protection", "safe"]
         }
     
+    def _read_metadata(self, snapshot: Optional[IndexSnapshot] = None) -> Tuple[int, Dict[str, Any]]:
+        """Documents and chunks from the metadata store, with the store generation read.
+        
+        Given a snapshot, only the documents changed since it was read are
+        fetched and merged into its metadata; everything is read when the
+        store's change log does not reach back that far.
+        """
+        changes = self.store.changes_since(snapshot.store_generation) if snapshot else None
+        if changes is None:
+            store_generation = self.store.generation()
+            return store_generation, {'documents': self.store.documents_by_id(), 'chunks': self.store.all_chunks()}
+        return changes.generation, _apply_changes(snapshot.metadata, changes.documents, changes.chunks)
+    
     def _load_index(self):
-        """Load FAISS index and metadata."""
+        """Load the live index generation and metadata, plus later changes as a delta."""
         try:
-            index_file = self.index_dir / "index.bin"
-            metadata_file = self.index_dir / "metadata.json"
-
-            if index_file.exists() and metadata_file.exists():
-                self.faiss_index = faiss.read_index(str(index_file))
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
+            self._manifest_signature = self.generations.signature()
+            manifest = self.generations.current()
+            snapshot = self._snapshot
 
-                    # Handle old format (array) vs new format (object)
-                    if isinstance(existing_data, list):
-                        # Convert old format to new format
-                        self.metadata = {'documents': {}, 'chunks': existing_data}
-                    else:
-                        self.metadata = existing_data
-
-                print(f"Loaded index with {len(self.metadata.get('chunks', []))} chunks")
+            if snapshot is not None and manifest is not None and manifest["generation"] == snapshot.generation:
+                # Same generation; a writer applied further changes as a delta
+                self._snapshot = self._with_delta(snapshot)
+            elif manifest is not None and self.store.count_chunks():
+                index_file = self.generations.index_path(manifest)
+                index = read_index(index_file, mmap=self.config.mmap_index)
+                configure_search(index, self.config)
+                
+                # The metadata may be newer than the index; documents changed
+                # since the index was built are hidden and re-added by the delta
+                _, metadata = self._read_metadata(snapshot)
+                self._snapshot = self._with_delta(self._make_snapshot(
+                    manifest["generation"], index, metadata, manifest.get("store_generation"),
+                    mmapped=self.config.mmap_index
+                ))
+                echo(f"Loaded index generation {manifest['generation']} with {self._snapshot.size} chunks")
+                if not index_is_normalized(index) and (
+                        self._normalize_rebuild is None or self._normalize_rebuild.done()):
+                    # Queries are normalized; rebuild so their scores are cosine similarities again
+                    echo("Index was built with unnormalized embeddings, rebuilding it in the background")
+                    self._normalize_rebuild = self.rebuild_in_background()
             else:
-                print("No existing index found. Will create new index when documents are added.")
+                echo("No existing index found. Will create new index when documents are added.")
 
         except Exception as e:
-            print(f"Error loading index: {e}")
-            self.faiss_index = None
-            self.metadata = None
+            # Keep serving the previous snapshot, if any
+            echo(f"Error loading index: {e}")
+    
+    def _make_snapshot(self, generation: int, index: Optional[faiss.Index], metadata: Dict[str, Any],
+                       store_generation: Optional[int] = None, mmapped: bool = False) -> IndexSnapshot:
+        """Build the BM25 index and the FAISS id -> chunk position map."""
+        chunks = metadata.get('chunks', [])
+        doc_positions: Dict[Optional[str], List[int]] = {}
+        for position, chunk in enumerate(chunks):
+            doc_positions.setdefault(chunk_doc_id(chunk), []).append(position)
+        return IndexSnapshot(
+            generation=generation,
+            index=index,
+            metadata=metadata,
+            bm25=BM25Index().build(chunk_text(chunk) for chunk in chunks),
+            id_positions=id_positions(chunks),
+            store_generation=store_generation,
+            doc_positions=doc_positions,
+            mmapped=mmapped
+        )
+    
+    @staticmethod
+    def _removed_positions(snapshot: IndexSnapshot, changes: StoreChanges) -> FrozenSet[int]:
+        """Base positions of the chunks of changed documents."""
+        return frozenset(
+            position for doc_id in changes.documents for position in snapshot.doc_positions.get(doc_id, ())
+        )
+    
+    def _make_delta(self, snapshot: IndexSnapshot, changes: StoreChanges) -> Optional[DeltaSegment]:
+        """Delta segment for the documents changed since the snapshot's generation was built."""
+        if not changes.documents:
+            return None
+        removed = self._removed_positions(snapshot, changes)
+        texts = [chunk_text(chunk) for chunk in changes.chunks]
+        index = None
+        if texts and snapshot.index is not None:
+            index = faiss.IndexFlat(snapshot.index.d, snapshot.index.metric_type)
+            index.add(self.embed_texts(texts))
+        return DeltaSegment(
+            store_generation=changes.generation,
+            documents=changes.documents,
+            chunks=changes.chunks,
+            index=index,
+            bm25=BM25Index().build(texts, reference=snapshot.bm25),
+            removed=removed
+        )
+    
+    def _with_delta(self, snapshot: IndexSnapshot) -> IndexSnapshot:
+        """The snapshot plus the documents changed since its generation was built.
+        
+        Without a usable change log (legacy index, log pruned) the snapshot is
+        returned as is.
+        """
+        changes = self.store.changes_since(snapshot.store_generation)
+        if changes is None:
+            return snapshot
+        return replace(snapshot, delta=self._make_delta(snapshot, changes))
     
-    def _get_embedding(self, text: str) -> np.ndarray:
-        """Get embedding for text using Ollama."""
+    def _current_snapshot(self) -> Optional[IndexSnapshot]:
+        """Current snapshot, switching first if another writer published a generation."""
+        if self.generations.signature() != self._manifest_signature:
+            # One thread reloads; the others keep serving the previous snapshot
+            if self._reload_lock.acquire(blocking=False):
+                try:
+                    if self.generations.signature() != self._manifest_signature:
+                        self._load_index()
+                finally:
+                    self._reload_lock.release()
+        return self._snapshot
+    
+    def _publish(self, index: faiss.Index, metadata: Dict[str, Any], store_generation: int):
+        """Make an index the live generation on disk and in this engine."""
+        manifest = self.generations.publish(index, store_generation)
+        self._manifest_signature = self.generations.signature()
+        self._snapshot = self._make_snapshot(manifest["generation"], index, metadata, store_generation)
+    
+    @property
+    def generation(self) -> int:
+        """Live index generation (0 before the first build)."""
+        return self._snapshot.generation if self._snapshot else 0
+    
+    def current_index_file(self) -> Optional[Path]:
+        """Path of the live generation's index file."""
+        manifest = self.generations.current()
+        return self.generations.index_path(manifest) if manifest else None
+    
+    def embed_query(self, text: str) -> np.ndarray:
+        """Unit-length embedding of a query, as used by vector search.
+        
+        Goes through the embedding cache shared by all processes on this
+        index: BabyCareRAG embeds a question for the answer cache, and the MCP
+        search tool's search for the same question then reads that vector
+        instead of calling the embedding server again.
+        """
+        cached = self.embedding_cache.get_many(self.embed_cache_model, [text])
+        if 0 in cached:
+            return cached[0]
         try:
-            response = requests.post(
-                self.embedding_url,
-                json={"model": self.embed_model, "prompt": text},
-                timeout=30
-            )
-            response.raise_for_status()
-            embedding = response.json()["embedding"]
-            return np.array(embedding, dtype=np.float32)
+            vector = self.embedder.embed(text)
         except Exception as e:
-            print(f"Error getting embedding: {e}")
+            echo(f"Error getting embedding: {e}")
             raise
+        self.embedding_cache.put_many(self.embed_cache_model, [text], [vector])
+        return vector
+    
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, computing only those missing from the embedding cache."""
+        cached = self.embedding_cache.get_many(self.embed_cache_model, texts)
+        missing = [i for i in range(len(texts)) if i not in cached]
+        
+        if missing:
+            echo(f"Embedding {len(missing)} new chunks ({len(cached)} cached)")
+            new_texts = [texts[i] for i in missing]
+            new_vectors = list(self.embedder.embed_many(new_texts))
+            self.embedding_cache.put_many(self.embed_cache_model, new_texts, new_vectors)
+            cached.update(zip(missing, new_vectors))
+        
+        return np.vstack([cached[i] for i in range(len(texts))])
     
     def _expand_query_with_synonyms(self, query: str) -> str:
         """Expand query with synonyms."""
@@ -105,79 +362,70 @@ class SearchEngine:
             if word in self.synonyms:
                 expanded_terms.extend(self.synonyms[word])
         
+        # CJK queries have no word breaks; match those synonym keys as substrings
+        lowered = query.lower()
+        for key, values in self.synonyms.items():
+            if not key.isascii() and key not in words and key in lowered:
+                expanded_terms.extend(values)
+        
         return " ".join(expanded_terms)
     
-    def _bm25_search(self, query: str, top_k: int = 20) -> List[Tuple[int, float]]:
+    def _bm25_search(self, query: str, top_k: int = 20,
+                     snapshot: Optional[IndexSnapshot] = None) -> List[Tuple[int, float]]:
         """Perform BM25 search on document chunks."""
-        if not self.metadata or not self.metadata.get('chunks'):
-            return []
-        
-        chunks = self.metadata['chunks']
-        query_terms = re.findall(r'\b\w+\b', query.lower())
-        
-        if not query_terms:
+        snapshot = snapshot or self._snapshot
+        if not snapshot:
             return []
         
-        # Calculate document frequencies
-        doc_freq = defaultdict(int)
-        total_docs = len(chunks)
-        
-        for chunk in chunks:
-            text = (chunk.get('text') or chunk.get('chunk') or '').lower()
-            text_terms = set(re.findall(r'\b\w+\b', text))
-            for term in query_terms:
-                if term in text_terms:
-                    doc_freq[term] += 1
+        delta = snapshot.delta
+        if delta is None:
+            return snapshot.bm25.search(query, top_k)
         
-        # Calculate BM25 scores
-        k1, b = 1.5, 0.75
-        scores = []
-        
-        for i, chunk in enumerate(chunks):
-            text = (chunk.get('text') or chunk.get('chunk') or '').lower()
-            text_terms = re.findall(r'\b\w+\b', text)
-            doc_len = len(text_terms)
-
-            if doc_len == 0:
-                scores.append((i, 0.0))
-                continue
-
-            # Calculate average document length
-            avg_doc_len = sum(len(re.findall(r'\b\w+\b', (c.get('text') or c.get('chunk') or '').lower())) for c in chunks) / total_docs
-            
-            score = 0.0
-            for term in query_terms:
-                tf = text_terms.count(term)
-                if tf > 0:
-                    idf = math.log((total_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
-                    score += idf * (tf * (k1 + 1)) / (tf + k1 * (1 - b + b * doc_len / avg_doc_len))
-            
-            scores.append((i, score))
-        
-        # Sort by score and return top_k
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores[:top_k]
+        # Over-fetch so hidden base chunks cannot crowd out live ones
+        results = [
+            (idx, score) for idx, score in snapshot.bm25.search(query, top_k + len(delta.removed))
+            if idx not in delta.removed
+        ]
+        results.extend((snapshot.base_size + idx, score) for idx, score in delta.bm25.search(query, top_k))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:top_k]
     
-    def _vector_search(self, query: str, top_k: int = 20) -> List[Tuple[int, float]]:
+    def _vector_search(self, query: str, top_k: int = 20,
+                       snapshot: Optional[IndexSnapshot] = None) -> List[Tuple[int, float]]:
         """Perform vector search using FAISS."""
-        if not self.faiss_index or not self.metadata:
+        snapshot = snapshot or self._snapshot
+        if not snapshot or not snapshot.index:
             return []
         
         try:
-            query_embedding = self._get_embedding(query).reshape(1, -1)
-            distances, indices = self.faiss_index.search(query_embedding, top_k)
+            query_embedding = self.embed_query(query).reshape(1, -1)
+            delta = snapshot.delta
+            removed = delta.removed if delta is not None else frozenset()
+            distances, indices = snapshot.index.search(query_embedding, top_k + len(removed))
+            
+            # Id-mapped indexes return chunk vector ids, legacy ones positions
+            if is_id_mapped(snapshot.index):
+                positions = [snapshot.id_positions.get(int(idx), -1) for idx in indices[0]]
+            else:
+                positions = [int(idx) for idx in indices[0]]
+            hits = list(zip(positions, distances[0]))
+            
+            if delta is not None and delta.index is not None and delta.index.ntotal:
+                distances, indices = delta.index.search(query_embedding, min(top_k, delta.index.ntotal))
+                hits.extend((snapshot.base_size + int(idx), dist) for idx, dist in zip(indices[0], distances[0]))
             
             # Convert distances to similarity scores (higher is better)
             scores = []
-            for i, (idx, dist) in enumerate(zip(indices[0], distances[0])):
-                if idx >= 0:  # Valid index
+            for idx, dist in hits:
+                if idx >= 0 and idx not in removed:  # Valid, live index
                     similarity = 1.0 / (1.0 + dist)  # Convert distance to similarity
                     scores.append((idx, similarity))
             
-            return scores
+            scores.sort(key=lambda item: item[1], reverse=True)
+            return scores[:top_k]
             
         except Exception as e:
-            print(f"Error in vector search: {e}")
+            echo(f"Error in vector search: {e}")
             return []
     
     def _reciprocal_rank_fusion(self, bm25_results: List[Tuple[int, float]], 
@@ -207,7 +455,8 @@ class SearchEngine:
     
     def search(self, query: str, top_k: int = 5) -> List[SearchResult]:
         """Perform hybrid search combining BM25 and vector search."""
-        if not self.metadata or not self.metadata.get('chunks'):
+        snapshot = self._current_snapshot()
+        if not snapshot or not snapshot.size:
             return []
         
         try:
@@ -215,10 +464,10 @@ class SearchEngine:
             expanded_query = self._expand_query_with_synonyms(query)
             
             # Perform BM25 search
-            bm25_results = self._bm25_search(expanded_query, self.config.search_top_k)
+            bm25_results = self._bm25_search(expanded_query, self.config.search_top_k, snapshot)
             
             # Perform vector search
-            vector_results = self._vector_search(query, self.config.search_top_k)
+            vector_results = self._vector_search(query, self.config.search_top_k, snapshot)
             
             # Combine results using RRF
             if bm25_results and vector_results:
@@ -232,83 +481,230 @@ class SearchEngine:
             
             # Convert to SearchResult objects
             search_results = []
-            chunks = self.metadata['chunks']
-            documents = self.metadata.get('documents', {})
+            documents = snapshot.documents
 
             for idx, score in combined_results[:top_k]:
-                if idx < len(chunks):
-                    chunk = chunks[idx]
-
-                    # Handle both old and new chunk formats
-                    chunk_text = chunk.get('text') or chunk.get('chunk', '')
-                    doc_id = chunk.get('doc_id', 'unknown')
-                    source_name = chunk.get('doc', 'Unknown Document')
-
-                    # Try to get better source name from documents metadata
-                    if doc_id in documents:
-                        doc_info = documents[doc_id]
-                        source_name = doc_info.get('title', source_name)
-
-                    search_results.append(SearchResult(
-                        text=chunk_text,
-                        source=source_name,
-                        score=score,
-                        chunk_id=chunk.get('id') or chunk.get('chunk_id'),
-                        metadata={
-                            'doc_id': doc_id,
-                            'chunk_id': chunk.get('chunk_id'),
-                            'file_path': documents.get(doc_id, {}).get('file_path')
-                        }
-                    ))
+                chunk = snapshot.chunk(idx)
+                if chunk is not None:
+                    search_results.append(self._to_search_result(chunk, score, documents))
             
             return search_results
             
         except Exception as e:
-            print(f"Error in search: {e}")
+            echo(f"Error in search: {e}")
             return []
     
+    @staticmethod
+    def _to_search_result(chunk: Dict[str, Any], score: float,
+                          documents: Mapping[str, Dict[str, Any]]) -> SearchResult:
+        # Handle both old and new chunk formats
+        chunk_text = chunk.get('text') or chunk.get('chunk', '')
+        doc_id = chunk.get('doc_id', 'unknown')
+        source_name = chunk.get('doc', 'Unknown Document')
+
+        # Try to get better source name from documents metadata
+        if doc_id in documents:
+            doc_info = documents[doc_id]
+            source_name = doc_info.get('title', source_name)
+
+        return SearchResult(
+            text=chunk_text,
+            source=source_name,
+            score=score,
+            chunk_id=chunk.get('id') or chunk.get('chunk_id'),
+            metadata={
+                'doc_id': doc_id,
+                'chunk_id': chunk.get('chunk_id'),
+                'file_path': documents.get(doc_id, {}).get('file_path')
+            }
+        )
+    
+    def results_for_chunks(self, chunk_ids: List[str]) -> List[SearchResult]:
+        """Search results for chunks already retrieved elsewhere, in the given order.
+        
+        Used to rebuild the results of a search that ran in another process
+        (the MCP tool) from its chunk ids, without searching again. Scores are
+        reciprocal ranks; ids no longer in the store are skipped.
+        """
+        found = self.store.get_chunks(list(dict.fromkeys(chunk_ids)))
+        documents = self.store.documents_by_id() if found else {}
+        results = []
+        for chunk_id in dict.fromkeys(chunk_ids):
+            if chunk_id in found:
+                results.append(self._to_search_result(found[chunk_id], 1.0 / (len(results) + 1), documents))
+        return results
+    
     def rebuild_index(self) -> bool:
-        """Rebuild the FAISS index from scratch."""
-        try:
-            metadata_file = self.index_dir / "metadata.json"
-            if not metadata_file.exists():
-                print("No metadata file found. Nothing to rebuild.")
+        """Rebuild the FAISS index from scratch as a new generation.
+        
+        The live snapshot keeps serving searches until the new generation
+        is complete and published.
+        """
+        with self._write_lock:
+            try:
+                store_generation, metadata = self._read_metadata(self._current_snapshot())
+                
+                chunks = metadata.get('chunks', [])
+                if not chunks:
+                    echo("No chunks found. Nothing to rebuild.")
+                    return False
+                
+                echo(f"Rebuilding index for {len(chunks)} chunks...")
+                
+                # One vector per distinct chunk id
+                ids, first = np.unique(chunk_vector_ids(chunks), return_index=True)
+                order = np.argsort(first)
+                ids, first = ids[order], first[order]
+                
+                # IVF clusters are trained on a random sample before vectors are
+                # added; the first chunks alone would cover only a few documents
+                index = None
+                if self.config.index_type == "ivf_flat":
+                    sample_size = min(len(first), self.config.ivf_nlist * _TRAIN_POINTS_PER_CLUSTER)
+                    sample = np.sort(np.random.default_rng(0).choice(first, size=sample_size, replace=False))
+                    train_vectors = self.embed_texts([chunk_text(chunks[i]) for i in sample])
+                    index = build_index(train_vectors.shape[1], self.config, train_vectors=train_vectors)
+                
+                # Embed and add in batches (reusing cached vectors) so memory stays flat
+                batch_size = self.config.embed_batch_size * self.config.embed_concurrency
+                for start in range(0, len(first), batch_size):
+                    batch = first[start:start + batch_size]
+                    vectors = self.embed_texts([chunk_text(chunks[i]) for i in batch])
+                    if index is None:
+                        index = build_index(vectors.shape[1], self.config)
+                    index.add_with_ids(vectors, ids[start:start + batch_size])
+                
+                # Write the new generation and switch to it
+                self._publish(index, metadata, store_generation)
+                
+                echo(f"Successfully rebuilt index with {len(chunks)} chunks (generation {self.generation})")
+                return True
+                
+            except Exception as e:
+                echo(f"Error rebuilding index: {e}")
                 return False
-            
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-            
-            chunks = metadata.get('chunks', [])
-            if not chunks:
-                print("No chunks found. Nothing to rebuild.")
+    
+    def rebuild_in_background(self) -> "Future[bool]":
+        """Run rebuild_index on a background thread; searches continue meanwhile."""
+        with self._rebuild_lock:
+            if self._rebuild_executor is None:
+                self._rebuild_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rebuild")
+        return self._rebuild_executor.submit(self.rebuild_index)
+    
+    def _writable_index(self) -> Optional[faiss.Index]:
+        """Private, id-mapped copy of the live index that can take new vectors.
+        
+        The live index is never modified in place, so running searches are
+        unaffected. Returns None when the index has to be rebuilt instead:
+        there is none yet, it holds unnormalized vectors or its type differs
+        from the configuration.
+        """
+        snapshot = self._current_snapshot()
+        if snapshot is None or snapshot.index is None or not index_is_normalized(snapshot.index):
+            return None
+        if snapshot.mmapped:
+            # In-memory copy; the mapped one stays valid for readers
+            index = read_index(self.current_index_file())
+            configure_search(index, self.config)
+        else:
+            index = faiss.clone_index(snapshot.index)
+        if index_type_of(index) != self.config.index_type:
+            echo(f"Index type changed to {self.config.index_type}, rebuilding")
+            return None
+        if not is_id_mapped(index):
+            try:
+                # Positional index that still matches the previous metadata
+                index = to_id_index(index, snapshot.metadata.get('chunks', []))
+            except Exception:
+                return None
+        return index
+    
+    def _accepts_delta(self, snapshot: IndexSnapshot) -> bool:
+        """Whether changes can be searched next to the snapshot's index instead of compacting."""
+        return (
+            snapshot.index is not None
+            and snapshot.store_generation is not None
+            and index_type_of(snapshot.index) == self.config.index_type
+            and index_is_normalized(snapshot.index)
+        )
+    
+    def update_index(self) -> bool:
+        """Apply metadata changes to the search index.
+        
+        Documents changed since the live generation was built are embedded
+        (mostly from the embedding cache) and searched as a small delta next
+        to it; only the manifest is rewritten, so an update costs time in
+        proportion to the changed documents, not the corpus. Once the delta
+        outgrows delta_max_chunks (or delta_max_ratio of the index) it is
+        compacted into a new generation. Falls back to a full rebuild when
+        there is no usable index yet.
+        """
+        with self._write_lock:
+            try:
+                snapshot = self._current_snapshot()
+                if snapshot is not None and self._accepts_delta(snapshot):
+                    changes = self.store.changes_since(snapshot.store_generation)
+                    limit = max(self.config.delta_max_chunks,
+                                int(self.config.delta_max_ratio * snapshot.base_size))
+                    # Sized before anything is embedded, so an oversized delta costs nothing
+                    if changes is not None and \
+                            len(changes.chunks) + len(self._removed_positions(snapshot, changes)) <= limit:
+                        delta = self._make_delta(snapshot, changes)
+                        if self.generations.mark_applied(snapshot.generation, changes.generation):
+                            self._manifest_signature = self.generations.signature()
+                            self._snapshot = replace(snapshot, delta=delta)
+                            echo(f"Updated index: {len(changes.documents)} changed documents "
+                                  f"({delta.size if delta else 0} delta chunks)")
+                            return True
+                return self._compact()
+                
+            except Exception as e:
+                echo(f"Error updating index: {e}")
+                return False
+    
+    def _compact(self) -> bool:
+        """Fold all changes into a new generation.
+        
+        The live index is copied, vectors of removed chunks are dropped with
+        remove_ids and new chunks are added (embeddings come from the cache),
+        instead of re-indexing everything.
+        """
+        with self._write_lock:
+            try:
+                store_generation, metadata = self._read_metadata(self._current_snapshot())
+                chunks = metadata.get('chunks', [])
+                if not chunks and self.faiss_index is None:
+                    echo("No chunks found. Nothing to update.")
+                    return False
+                
+                index = self._writable_index()
+                if index is None:
+                    return self.rebuild_index()
+                
+                wanted = id_positions(chunks)
+                present = set(index_ids(index).tolist())
+                
+                stale = np.array(sorted(present - wanted.keys()), dtype=np.int64)
+                new_ids = [vector_id for vector_id in wanted if vector_id not in present]
+                
+                if len(stale):
+                    if not supports_remove(index):
+                        # HNSW cannot delete; rebuilding is cheap with cached embeddings
+                        return self.rebuild_index()
+                    index.remove_ids(stale)
+                # Embed and add in batches (reusing cached vectors) so memory stays flat
+                batch_size = self.config.embed_batch_size * self.config.embed_concurrency
+                for start in range(0, len(new_ids), batch_size):
+                    batch = new_ids[start:start + batch_size]
+                    vectors = self.embed_texts([chunk_text(chunks[wanted[i]]) for i in batch])
+                    index.add_with_ids(vectors, np.array(batch, dtype=np.int64))
+                
+                # Write the new generation and switch to it
+                self._publish(index, metadata, store_generation)
+                
+                echo(f"Compacted index: +{len(new_ids)} / -{len(stale)} chunks ({index.ntotal} total)")
+                return True
+                
+            except Exception as e:
+                echo(f"Error compacting index: {e}")
                 return False
-            
-            print(f"Rebuilding index for {len(chunks)} chunks...")
-            
-            # Get embeddings for all chunks
-            embeddings = []
-            for chunk in tqdm(chunks, desc="Generating embeddings"):
-                embedding = self._get_embedding(chunk['text'])
-                embeddings.append(embedding)
-            
-            # Create FAISS index
-            embeddings_array = np.vstack(embeddings)
-            dimension = embeddings_array.shape[1]
-            
-            index = faiss.IndexFlatL2(dimension)
-            index.add(embeddings_array)
-            
-            # Save index
-            index_file = self.index_dir / "index.bin"
-            faiss.write_index(index, str(index_file))
-            
-            # Update in-memory index
-            self.faiss_index = index
-            self.metadata = metadata
-            
-            print(f"Successfully rebuilt index with {len(chunks)} chunks")
-            return True
-            
-        except Exception as e:
-            print(f"Error rebuilding index: {e}")
-            return False
@@ -0,0 +1,167 @@
+"""FAISS index helpers for BabyCare RAG system."""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import faiss
+import numpy as np
+
+from .output import echo
+
+
+def chunk_key(chunk: Dict[str, Any]) -> str:
+    """Stable identifier of a chunk in either metadata format."""
+    if chunk.get('id'):
+        return str(chunk['id'])
+    # Legacy list format: {"doc": file name, "chunk_id": "<stem>_<n>"}
+    return f"{chunk.get('doc')}#{chunk.get('chunk_id')}"
+
+
+def chunk_text(chunk: Dict[str, Any]) -> str:
+    """Text of a chunk in either metadata format."""
+    return chunk.get('text') or chunk.get('chunk') or ''
+
+
+def chunk_vector_id(chunk: Dict[str, Any]) -> int:
+    """64-bit FAISS id derived from the chunk id and its content.
+
+    Including the content means a chunk whose text changed gets a new id, so
+    incremental updates replace its vector instead of keeping a stale one.
+    """
+    digest = hashlib.blake2b(
+        f"{chunk_key(chunk)}\0{chunk_text(chunk)}".encode('utf-8'), digest_size=8
+    ).digest()
+    # FAISS ids are signed; keep them non-negative (-1 means "no result")
+    return int.from_bytes(digest, 'little') & 0x7FFF_FFFF_FFFF_FFFF
+
+
+def chunk_vector_ids(chunks: Iterable[Dict[str, Any]]) -> np.ndarray:
+    return np.fromiter((chunk_vector_id(c) for c in chunks), dtype=np.int64)
+
+
+def is_id_mapped(index: faiss.Index) -> bool:
+    return isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2))
+
+
+def index_ids(index: faiss.Index) -> np.ndarray:
+    """Ids stored in an id-mapped index."""
+    return faiss.vector_to_array(index.id_map).astype(np.int64)
+
+
+def new_id_index(dimension: int) -> faiss.Index:
+    """Empty exact index that stores vectors under explicit ids."""
+    return faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+
+
+def to_id_index(index: faiss.Index, chunks: List[Dict[str, Any]]) -> faiss.Index:
+    """Convert a positional index (vector i = chunks[i]) to an id-mapped one."""
+    if is_id_mapped(index):
+        return index
+    if index.ntotal != len(chunks):
+        raise ValueError(f"Index has {index.ntotal} vectors but metadata has {len(chunks)} chunks")
+
+    id_index = new_id_index(index.d)
+    if index.ntotal:
+        vectors = index.reconstruct_n(0, index.ntotal)
+        ids = chunk_vector_ids(chunks)
+        # Duplicate chunks collapse onto one id
+        _, first = np.unique(ids, return_index=True)
+        first.sort()
+        id_index.add_with_ids(vectors[first], ids[first])
+    return id_index
+
+
+def id_positions(chunks: List[Dict[str, Any]]) -> Dict[int, int]:
+    """Map FAISS ids to positions in the chunk list (first occurrence wins)."""
+    positions: Dict[int, int] = {}
+    for pos, vector_id in enumerate(chunk_vector_ids(chunks).tolist()):
+        positions.setdefault(vector_id, pos)
+    return positions
+
+
+# FAISS warns below ~39 training points per IVF cluster
+_MIN_POINTS_PER_CLUSTER = 39
+
+
+def _inner_index(index: faiss.Index) -> faiss.Index:
+    return faiss.downcast_index(index.index) if is_id_mapped(index) else index
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """Name of the RAGConfig.index_type an index was built with."""
+    inner = _inner_index(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    """HNSW graphs cannot delete vectors; flat and IVF indexes can."""
+    return index_type_of(index) != "hnsw"
+
+
+def build_index(dimension: int, config, train_vectors: np.ndarray = None) -> faiss.Index:
+    """Create an empty id-mapped index of the configured type.
+
+    IVF indexes are trained on ``train_vectors``; ``nlist`` is reduced when
+    there are too few vectors to train that many clusters.
+    """
+    index_type = config.index_type
+    if index_type == "flat":
+        index = new_id_index(dimension)
+    elif index_type == "hnsw":
+        index = faiss.index_factory(dimension, f"IDMap2,HNSW{config.hnsw_m},Flat")
+        _inner_index(index).hnsw.efConstruction = config.hnsw_ef_construction
+    elif index_type == "ivf_flat":
+        if train_vectors is None or len(train_vectors) == 0:
+            raise ValueError("IVF index needs training vectors")
+        nlist = max(1, min(config.ivf_nlist, len(train_vectors) // _MIN_POINTS_PER_CLUSTER))
+        index = faiss.index_factory(dimension, f"IDMap2,IVF{nlist},Flat")
+        index.train(np.ascontiguousarray(train_vectors, dtype=np.float32))
+    else:
+        raise ValueError(f"Unknown index type: {index_type}")
+
+    configure_search(index, config)
+    return index
+
+
+def configure_search(index: faiss.Index, config):
+    """Apply query-time knobs (efSearch, nprobe) from the configuration."""
+    inner = _inner_index(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = config.hnsw_ef_search
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = config.ivf_nprobe
+
+
+def read_index(path: Path, mmap: bool = False) -> faiss.Index:
+    """Read an index, optionally memory-mapped and read-only.
+
+    Mapped indexes share page-cache pages between processes and load almost
+    instantly. Falls back to a normal read when the index type or FAISS
+    build does not support mapping.
+    """
+    if mmap:
+        # IO_FLAG_MMAP_IFC maps flat vector storage (FAISS >= 1.10)
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        try:
+            return faiss.read_index(str(path), flags)
+        except Exception as e:
+            echo(f"Memory-mapped load not supported for {path}, reading into memory: {e}")
+    return faiss.read_index(str(path))
+
+
+def write_index(index: faiss.Index, path: Path):
+    """Write an index atomically.
+
+    The new file replaces the old one by rename, so processes that have the
+    old file memory-mapped keep reading a consistent copy.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    faiss.write_index(index, str(tmp_path))
+    os.replace(tmp_path, path)
@@ -1,9 +1,7 @@
 from perception import PerceptionResult
 from memory import MemoryItem
 from typing import List, Optional
-from dotenv import load_dotenv
-from openai import OpenAI  # fallback if get_secret is unavailable
-import os
+from llm_client import client, get_async_client, llm_model
 import re
 
 # Optional: import log from agent if shared, else define locally
@@ -15,23 +13,11 @@ except ImportError:
         now = datetime.datetime.now().strftime("%H:%M:%S")
         print(f"[{now}] [{stage}] {msg}")
 
-load_dotenv()
-# Initialize OpenAI client via external get_secret if available
-try:
-    import sys as _sys
-    _sys.path.append("/home/ubuntu/ios_backend")
-    from bk_ask.config import get_secret as _get_secret
-    client = _get_secret()
-except Exception:
-    client = OpenAI()
-
-def generate_plan(
+def _plan_prompt(
     perception: PerceptionResult,
     memory_items: List[MemoryItem],
     tool_descriptions: Optional[str] = None
 ) -> str:
-    """Generates a plan (tool call or final answer) using LLM based on structured perception and memory."""
-
     memory_texts = "\n".join(f"- {m.text}" for m in memory_items) or "None"
 
     tool_context = f"\nYou have access to the following tools:\n{tool_descriptions}" if tool_descriptions else ""
@@ -97,30 +83,105 @@ IMPORTANT:
   * Safety guidelines and best practices
   * Age-specific information for babies and children
 """
+    return prompt
+
+
+def _parse_plan(raw: str) -> str:
+    log("plan", f"LLM raw output: {raw}")
+
+    for line in raw.splitlines():
+        if line.strip().startswith("FUNCTION_CALL:") or line.strip().startswith("FINAL_ANSWER:"):
+            log("plan", f"Found structured response: {line.strip()}")
+            return line.strip()
+
+    # If no structured response found, but contains temperature info (robust matching), format it
+    temp_pattern = r"((?:6\s*8)\s*(?:-|–|~|to)\s*(?:7\s*2)\s*(?:°\s*)?F)(?:\s*(?:\(|\s)\s*((?:2\s*0)\s*(?:-|–|~|to)\s*(?:2\s*2)\s*(?:°\s*)?C)\)?)?"
+    if re.search(temp_pattern, raw, flags=re.IGNORECASE):
+        log("plan", "Found temperature in unstructured response, formatting (regex match)...")
+        return f"FINAL_ANSWER: {raw.strip()}"
+
+    # Fallback: wrap any non-structured raw as FINAL_ANSWER so the agent can converge
+    return f"FINAL_ANSWER: {raw.strip()}"
+
 
+def generate_plan(
+    perception: PerceptionResult,
+    memory_items: List[MemoryItem],
+    tool_descriptions: Optional[str] = None
+) -> str:
+    """Generates a plan (tool call or final answer) using LLM based on structured perception and memory."""
     try:
         response = client.chat.completions.create(
-            model=os.getenv("OPENAI_LLM_MODEL", "gpt-4o-mini"),
-            messages=[{"role": "user", "content": prompt}],
+            model=llm_model(),
+            messages=[{"role": "user", "content": _plan_prompt(perception, memory_items, tool_descriptions)}],
             temperature=0.2,
         )
         raw = (response.choices[0].message.content or "").strip()
-        log("plan", f"LLM raw output: {raw}")
+        return _parse_plan(raw)
 
-        for line in raw.splitlines():
-            if line.strip().startswith("FUNCTION_CALL:") or line.strip().startswith("FINAL_ANSWER:"):
-                log("plan", f"Found structured response: {line.strip()}")
-                return line.strip()
+    except Exception as e:
+        log("plan", f"⚠️ Decision generation failed: {e}")
+        return "FINAL_ANSWER: [unknown]"
 
-        # If no structured response found, but contains temperature info (robust matching), format it
-        temp_pattern = r"((?:6\s*8)\s*(?:-|–|~|to)\s*(?:7\s*2)\s*(?:°\s*)?F)(?:\s*(?:\(|\s)\s*((?:2\s*0)\s*(?:-|–|~|to)\s*(?:2\s*2)\s*(?:°\s*)?C)\)?)?"
-        if re.search(temp_pattern, raw, flags=re.IGNORECASE):
-            log("plan", "Found temperature in unstructured response, formatting (regex match)...")
-            return f"FINAL_ANSWER: {raw.strip()}"
 
-        # Fallback: wrap any non-structured raw as FINAL_ANSWER so the agent can converge
-        return f"FINAL_ANSWER: {raw.strip()}"
+async def generate_plan_async(
+    perception: PerceptionResult,
+    memory_items: List[MemoryItem],
+    tool_descriptions: Optional[str] = None
+) -> Optional[str]:
+    """Same as generate_plan, but awaits the LLM call instead of blocking the event loop.
+
+    Returns None when the LLM call fails, instead of a FINAL_ANSWER placeholder.
+    """
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=llm_model(),
+            messages=[{"role": "user", "content": _plan_prompt(perception, memory_items, tool_descriptions)}],
+            temperature=0.2,
+        )
+        raw = (response.choices[0].message.content or "").strip()
+        return _parse_plan(raw)
 
     except Exception as e:
         log("plan", f"⚠️ Decision generation failed: {e}")
-        return "FINAL_ANSWER: [unknown]"
+        return None
+
+
+def _answer_prompt(question: str, snippets: List[str]) -> str:
+    results = "\n\n".join(snippets) or "None"
+    return f"""
+You are a baby-care assistant. Answer the user's question using ONLY the search results below.
+
+Question: "{question}"
+
+Search results:
+{results}
+
+Rules:
+- Give a concise, direct answer with just the key information requested, in the language of the question.
+- Temperature ranges: if you identify a range in °F (e.g., 68–72°F), give both units: "68–72°F (20–22°C)".
+- Sources: the results contain snippets like "[Source: FILENAME, ...]"; end with a final line "Sources: FILENAME1; FILENAME2" listing the unique filenames you used.
+- If the results do not answer the question, say exactly: I could not find specific information about this topic in the available documents.
+- Do NOT add any other text or formatting.
+"""
+
+
+async def synthesize_answer_async(question: str, snippets: List[str]) -> Optional[str]:
+    """Answers a question from retrieved snippets in a single LLM call.
+
+    Returns None if the call fails, so the caller can fall back to planning.
+    """
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=llm_model(),
+            messages=[{"role": "user", "content": _answer_prompt(question, snippets)}],
+            temperature=0.2,
+        )
+        raw = (response.choices[0].message.content or "").strip()
+        log("plan", f"LLM answer: {raw}")
+        answer = raw.replace("FINAL_ANSWER:", "", 1).strip() if raw.startswith("FINAL_ANSWER:") else raw
+        return answer or None
+
+    except Exception as e:
+        log("plan", f"⚠️ Answer synthesis failed: {e}")
+        return None
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import weakref
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI
+
+load_dotenv()
+
+# Per-request timeout (seconds) and retries on connection errors, 408/409/429 and 5xx
+LLM_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+LLM_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+
+
+def llm_model() -> str:
+    return os.getenv("OPENAI_LLM_MODEL", "gpt-4o-mini")
+
+
+# Initialize OpenAI client via external get_secret if available
+try:
+    import sys as _sys
+    _sys.path.append("/home/ubuntu/ios_backend")
+    from bk_ask.config import get_secret as _get_secret
+    client = _get_secret()
+except Exception:
+    client = OpenAI(timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES)
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> AsyncOpenAI:
+    """Pooled AsyncOpenAI client for the running event loop.
+
+    Uses the same credentials and endpoint as the sync ``client``. httpx
+    connections belong to the loop that opened them, so one client (and one
+    keep-alive pool) is kept per loop; in the RAG service that is the single
+    long-lived agent loop shared by all sessions.
+    """
+    loop = asyncio.get_running_loop()
+    async_client = _async_clients.get(loop)
+    if async_client is None:
+        async_client = AsyncOpenAI(
+            api_key=getattr(client, "api_key", None),
+            organization=getattr(client, "organization", None),
+            base_url=getattr(client, "base_url", None),
+            timeout=LLM_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS
+                )
+            )
+        )
+        _async_clients[loop] = async_client
+    return async_client
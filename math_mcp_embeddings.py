@@ -5,18 +5,10 @@ from mcp import types
 from PIL import Image as PILImage
 import math
 import sys
-import os
-import json
-import faiss
-import numpy as np
 from pathlib import Path
-import requests
-from markitdown import MarkItDown
 import time
 from models import AddInput, AddOutput, SqrtInput, SqrtOutput, StringsToIntsInput, StringsToIntsOutput, ExpSumInput, ExpSumOutput, TemperatureInput, TemperatureOutput
-from PIL import Image as PILImage
-from tqdm import tqdm
-import hashlib
+import threading
 from dotenv import load_dotenv
 
 
@@ -24,63 +16,47 @@ mcp = FastMCP("Calculator")
 
 # Load env and allow configurable embedding endpoint/model
 load_dotenv()
-EMBED_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-EMBED_URL = f"{EMBED_BASE_URL.rstrip('/')}/api/embeddings"
-EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+# Word chunks the search tool has always used
 CHUNK_SIZE = 256
 CHUNK_OVERLAP = 40#can be set up to 50
 ROOT = Path(__file__).parent.resolve()
-from rank_bm25 import BM25Okapi
+from babycare_rag.config import RAGConfig
+from babycare_rag.ingest import IngestPipeline
+from babycare_rag.document_processor import DocumentProcessor
+from babycare_rag.metadata_store import legacy_doc_id
+from babycare_rag.output import set_output
+from babycare_rag.search_engine import SearchEngine
 
+# stdout carries the MCP protocol; babycare_rag progress messages go to stderr
+set_output(sys.stderr)
+
+
+_ENGINE_LOCK = threading.Lock()
+_engine: SearchEngine | None = None
+
+
+def get_engine() -> SearchEngine:
+    """The shared babycare_rag search engine, loaded once and kept warm.
+
+    It switches to a new index generation by itself when another process
+    publishes one, so the MCP tool and BabyCareRAG always search the same
+    index, metadata store and BM25 model.
+    """
+    global _engine
+    if _engine is None:
+        with _ENGINE_LOCK:
+            if _engine is None:
+                # Embedding endpoint/model, mmap and worker settings come from the env
+                config = RAGConfig(
+                    documents_dir=str(ROOT / "documents"),
+                    index_dir=str(ROOT / "faiss_index"),
+                    chunk_size=CHUNK_SIZE,
+                    chunk_overlap=CHUNK_OVERLAP,
+                    chunk_unit="word"
+                )
+                _engine = SearchEngine(config)
+    return _engine
 
-def _load_synonyms() -> dict:
-    try:
-        return json.loads((ROOT / 'babycare_synonyms.json').read_text(encoding='utf-8'))
-    except Exception:
-        return {}
-
-
-def _expand_query_with_synonyms(text: str) -> str:
-    syn = _load_synonyms()
-    tokens = list(text)
-    expanded = []
-    for t in tokens:
-        expanded.append(t)
-        if t in syn:
-            expanded.extend(syn[t])
-    return " ".join(expanded)
-
-
-def _bm25_search(expanded_query: str, metadata: list[dict], top_k: int = 20) -> dict[int, float]:
-    corpus = [m['chunk'] for m in metadata]
-    tokenized_corpus = [list(doc) for doc in corpus]
-    bm25 = BM25Okapi(tokenized_corpus)
-    scores = bm25.get_scores(list(expanded_query))
-    # take top_k indices by score
-    idxs = np.argsort(scores)[::-1][:top_k]
-    return {int(i): float(scores[int(i)]) for i in idxs}
-
-
-def _rrf_fusion(bm25_indices: iter, vec_ranking: list[int], k: int = 60) -> list[int]:
-    # bm25_indices is a set/dict keys of indices
-    bm25_ranks = {idx: rank + 1 for rank, idx in enumerate(bm25_indices)}
-    vec_ranks = {idx: rank + 1 for rank, idx in enumerate(vec_ranking)}
-    all_ids = set(bm25_ranks.keys()) | set(vec_ranks.keys())
-    def score(doc_id: int) -> float:
-        s = 0.0
-        if doc_id in bm25_ranks:
-            s += 1.0 / (bm25_ranks[doc_id] + k)
-        if doc_id in vec_ranks:
-            s += 1.0 / (vec_ranks[doc_id] + k)
-        return s
-    ranked = sorted(all_ids, key=lambda d: score(d), reverse=True)
-    return ranked
-
-
-def get_embedding(text: str) -> np.ndarray:
-    response = requests.post(EMBED_URL, json={"model": EMBED_MODEL, "prompt": text})
-    response.raise_for_status()
-    return np.array(response.json()["embedding"], dtype=np.float32)
 
 from temperature_rules import extract_temperature
 
@@ -95,56 +71,36 @@ def _format_temp_range_as_both_units(min_v: float, max_v: float, unit: str) -> s
         return f"{int(round(fmin))}–{int(round(fmax))}°F ({int(min_v)}–{int(max_v)}°C)"
 
 
-def chunk_text(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
-    words = text.split()
-    for i in range(0, len(words), size - overlap):
-        yield " ".join(words[i:i+size])
-
 def mcp_log(level: str, message: str) -> None:
     """Log a message to stderr to avoid interfering with JSON communication"""
     sys.stderr.write(f"{level}: {message}\n")
     sys.stderr.flush()
 
+
 @mcp.tool()
 def search_documents(query: str) -> list[str]:
     """Hybrid search (BM25+Vector) with query expansion and RRF fusion. Returns top snippets with source filenames."""
     ensure_faiss_ready()
     mcp_log("SEARCH", f"Query: {query}")
     try:
-        # Load metadata and FAISS index
-        index = faiss.read_index(str(ROOT / "faiss_index" / "index.bin"))
-        metadata = json.loads((ROOT / "faiss_index" / "metadata.json").read_text())
-
-        # 1) Query expansion via local synonyms
-        expanded = _expand_query_with_synonyms(query)
+        # Same hybrid search as BabyCareRAG.search_documents: synonym
+        # expansion, BM25 + vector search and RRF fusion over the shared index
+        hits = get_engine().search(query, top_k=5)
 
-        # 2) BM25 over chunk texts
-        bm25_scores = _bm25_search(expanded, metadata, top_k=20)
-
-        # 3) Vector search over original query
-        query_vec = get_embedding(query).reshape(1, -1)
-        _D, I = index.search(query_vec, k=20)
-        vec_ranking = [int(i) for i in I[0] if i < len(metadata)]
-
-        # 4) RRF fusion
-        fused = _rrf_fusion(bm25_scores.keys(), vec_ranking, k=60)
-
-        # 5) Compose results with file name and chunk id, with temperature range extraction
-        top_indices = fused[:5]  # Reduce to 5 for more focused results
+        # Compose results with source and chunk id, with temperature range extraction
         results = []
         sources = []
-        for idx in top_indices:
-            data = metadata[idx]
-            chunk_text = data['chunk']
+        for hit in hits:
+            chunk_text = hit.text
             # Try to extract temperature range and format with both units
             temps = extract_temperature(chunk_text)
             if temps:
                 t = temps[0]
                 formatted = _format_temp_range_as_both_units(t['min'], t['max'], t['unit'])
-                results.append(f"{formatted}\n[Source: {data['doc']}, ID: {data['chunk_id']}]")
+                results.append(f"{formatted}\n[Source: {hit.source}, ID: {hit.chunk_id}]")
             else:
-                results.append(f"{chunk_text}\n[Source: {data['doc']}, ID: {data['chunk_id']}]")
-            sources.append(data['doc'])
+                results.append(f"{chunk_text}\n[Source: {hit.source}, ID: {hit.chunk_id}]")
+            sources.append(hit.source)
         # append a final Sources line (unique)
         if sources:
             uniq = []
@@ -334,65 +290,30 @@ def debug_error(error: str) -> list[base.Message]:
     ]
 
 def process_documents():
-    """Process documents and create FAISS index"""
+    """Sync the documents folder into the shared index"""
     mcp_log("INFO", "Indexing documents with MarkItDown...")
-    ROOT = Path(__file__).parent.resolve()
-    DOC_PATH = ROOT / "documents"
-    INDEX_CACHE = ROOT / "faiss_index"
-    INDEX_CACHE.mkdir(exist_ok=True)
-    INDEX_FILE = INDEX_CACHE / "index.bin"
-    METADATA_FILE = INDEX_CACHE / "metadata.json"
-    CACHE_FILE = INDEX_CACHE / "doc_index_cache.json"
-
-    def file_hash(path):
-        return hashlib.md5(Path(path).read_bytes()).hexdigest()
-
-    CACHE_META = json.loads(CACHE_FILE.read_text()) if CACHE_FILE.exists() else {}
-    metadata = json.loads(METADATA_FILE.read_text()) if METADATA_FILE.exists() else []
-    index = faiss.read_index(str(INDEX_FILE)) if INDEX_FILE.exists() else None
-    all_embeddings = []
-    converter = MarkItDown()
-
-    for file in DOC_PATH.glob("*.*"):
-        fhash = file_hash(file)
-        if file.name in CACHE_META and CACHE_META[file.name] == fhash:
-            mcp_log("SKIP", f"Skipping unchanged file: {file.name}")
-            continue
-
-        mcp_log("PROC", f"Processing: {file.name}")
-        try:
-            result = converter.convert(str(file))
-            markdown = result.text_content
-            chunks = list(chunk_text(markdown))
-            embeddings_for_file = []
-            new_metadata = []
-            for i, chunk in enumerate(tqdm(chunks, desc=f"Embedding {file.name}")):
-                embedding = get_embedding(chunk)
-                embeddings_for_file.append(embedding)
-                new_metadata.append({"doc": file.name, "chunk": chunk, "chunk_id": f"{file.stem}_{i}"})
-            if embeddings_for_file:
-                if index is None:
-                    dim = len(embeddings_for_file[0])
-                    index = faiss.IndexFlatL2(dim)
-                index.add(np.stack(embeddings_for_file))
-                metadata.extend(new_metadata)
-            CACHE_META[file.name] = fhash
-        except Exception as e:
-            mcp_log("ERROR", f"Failed to process {file.name}: {e}")
-
-    CACHE_FILE.write_text(json.dumps(CACHE_META, indent=2))
-    METADATA_FILE.write_text(json.dumps(metadata, indent=2))
-    if index and index.ntotal > 0:
-        faiss.write_index(index, str(INDEX_FILE))
-        mcp_log("SUCCESS", "Saved FAISS index and metadata")
+    engine = get_engine()
+    legacy = [
+        doc for doc in engine.store.list_documents()
+        if doc['doc_id'] == legacy_doc_id(Path(doc['file_path']).name)
+    ]
+    if legacy:
+        # Chunks imported from metadata.json are split differently from the
+        # shared chunker's, so their files are chunked and embedded once more
+        mcp_log("INFO", f"Re-indexing {len(legacy)} documents imported from metadata.json (one-time re-embed)")
+    pipeline = IngestPipeline(DocumentProcessor(engine.config, store=engine.store), engine)
+    # Per-file sync state, in the cache file the server has always used
+    report = pipeline.sync(ROOT / "documents", Path(engine.config.index_dir) / "doc_index_cache.json")
+
+    for name in report.documents_failed:
+        mcp_log("ERROR", f"Failed to process {Path(name).name}")
+    if report.documents_processed:
+        mcp_log("SUCCESS", f"Indexed {report.documents_processed} documents ({report.chunks_indexed} chunks)")
     else:
         mcp_log("WARN", "No new documents or updates to process.")
 
 def ensure_faiss_ready():
-    from pathlib import Path
-    index_path = ROOT / "faiss_index" / "index.bin"
-    meta_path = ROOT / "faiss_index" / "metadata.json"
-    if not (index_path.exists() and meta_path.exists()):
+    if get_engine().faiss_index is None:
         mcp_log("INFO", "Index not found — running process_documents()...")
         process_documents()
     else:
@@ -419,6 +340,12 @@ if __name__ == "__main__":
         # Process documents after server is running
         process_documents()
 
+        # Warm the search engine before the first query
+        try:
+            get_engine()
+        except Exception as e:
+            mcp_log("WARN", f"Search engine not loaded: {e}")
+
         # Keep the main thread alive
         try:
             while True:
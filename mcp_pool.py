@@ -0,0 +1,200 @@
+import asyncio
+import contextlib
+import datetime
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+
+# Same format as agent.log; agent imports this module, so it is not imported from there
+def log(stage: str, msg: str):
+    now = datetime.datetime.now().strftime("%H:%M:%S")
+    print(f"[{now}] [{stage}] {msg}")
+
+
+def default_server_params() -> StdioServerParameters:
+    """Parameters for launching the local embeddings MCP server."""
+    return StdioServerParameters(
+        command="python",
+        args=["math_mcp_embeddings.py"],
+        cwd=str(Path(__file__).parent.resolve())
+    )
+
+
+@dataclass
+class PooledSession:
+    """An initialized MCP session and the tools it exposes."""
+    session: ClientSession
+    tools: list[Any]
+
+
+class _Worker:
+    """Owns one MCP server subprocess for its whole lifetime.
+
+    stdio_client and ClientSession are async context managers whose cancel
+    scopes must be entered and exited by the same task, so each worker keeps
+    them open inside a dedicated task until it is asked to stop.
+    """
+
+    def __init__(self, params: StdioServerParameters):
+        self.params = params
+        self.conn: Optional[PooledSession] = None
+        self.error: Optional[BaseException] = None
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.conn is not None and self._task is not None and not self._task.done()
+
+    async def start(self, timeout: float):
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise TimeoutError(f"MCP server did not initialize within {timeout}s")
+        if not self.alive:
+            raise RuntimeError(f"MCP server failed to start: {self.error}")
+
+    async def _run(self):
+        try:
+            async with stdio_client(self.params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    tools = (await session.list_tools()).tools
+                    self.conn = PooledSession(session=session, tools=tools)
+                    self._ready.set()
+                    await self._stop.wait()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.conn = None
+            self._ready.set()
+
+    async def close(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._task is None or self._task.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except (asyncio.TimeoutError, Exception):
+            self._task.cancel()
+            with contextlib.suppress(BaseException):
+                await self._task
+
+
+class MCPSessionPool:
+    """Pool of warm MCP sessions borrowed per question instead of spawned.
+
+    Each session is health-checked with a ping before it is handed out and
+    restarted if the ping fails or the borrower left it broken. The pool is
+    bound to the event loop it is started on.
+    """
+
+    def __init__(
+        self,
+        server_params: Optional[StdioServerParameters] = None,
+        size: int = 2,
+        startup_timeout: float = 60.0,
+        ping_timeout: float = 5.0
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.server_params = server_params or default_server_params()
+        self.size = size
+        self.startup_timeout = startup_timeout
+        self.ping_timeout = ping_timeout
+        # Set only once start() succeeds; a failed start leaves the pool unstarted
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock = asyncio.Lock()
+        self._workers: list[_Worker] = []
+        self._closed = False
+
+    async def _spawn(self) -> _Worker:
+        worker = _Worker(self.server_params)
+        await worker.start(self.startup_timeout)
+        return worker
+
+    async def start(self):
+        """Launch and initialize all sessions concurrently."""
+        async with self._start_lock:
+            if self._idle is not None:
+                return
+
+            workers = [_Worker(self.server_params) for _ in range(self.size)]
+            results = await asyncio.gather(
+                *(w.start(self.startup_timeout) for w in workers),
+                return_exceptions=True
+            )
+            failures = [r for r in results if isinstance(r, BaseException)]
+            if len(failures) == len(workers):
+                raise RuntimeError(f"Could not start any MCP session: {failures[0]}")
+            for failure in failures:
+                log("pool", f"MCP session failed to start, will retry on demand: {failure}")
+
+            # Failed workers stay in the pool and are restarted when borrowed
+            idle: asyncio.Queue = asyncio.Queue()
+            for worker in workers:
+                self._workers.append(worker)
+                idle.put_nowait(worker)
+            self._idle = idle
+            log("pool", f"{len(workers) - len(failures)}/{len(workers)} MCP sessions ready")
+
+    async def _is_healthy(self, worker: _Worker) -> bool:
+        if not worker.alive:
+            return False
+        try:
+            await asyncio.wait_for(worker.conn.session.send_ping(), self.ping_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _ensure_healthy(self, worker: _Worker) -> _Worker:
+        if await self._is_healthy(worker):
+            return worker
+
+        log("pool", "Restarting unhealthy MCP session")
+        await worker.close()
+        replacement = await self._spawn()
+        self._workers[self._workers.index(worker)] = replacement
+        return replacement
+
+    @contextlib.asynccontextmanager
+    async def session(self):
+        """Borrow a healthy session; it is returned to the pool on exit."""
+        if self._closed:
+            raise RuntimeError("MCP session pool is closed")
+        if self._idle is None:
+            await self.start()
+
+        worker = await self._idle.get()
+        try:
+            worker = await self._ensure_healthy(worker)
+        except Exception:
+            self._idle.put_nowait(worker)
+            raise
+
+        failed = False
+        try:
+            yield worker.conn
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            try:
+                if failed and not await self._is_healthy(worker):
+                    # Leave restarting to the next borrower so this one fails fast
+                    await worker.close()
+            finally:
+                self._idle.put_nowait(worker)
+
+    async def close(self):
+        """Stop every session and its server subprocess."""
+        self._closed = True
+        await asyncio.gather(*(w.close() for w in self._workers), return_exceptions=True)
+        self._workers.clear()
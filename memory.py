@@ -2,11 +2,11 @@
 
 import numpy as np
 import faiss
-import requests
 from typing import List, Optional, Literal
 from pydantic import BaseModel
 from datetime import datetime
 import os
+from babycare_rag.embeddings import shared_client
 
 
 class MemoryItem(BaseModel):
@@ -25,17 +25,14 @@ class MemoryManager:
         base = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434").rstrip('/')
         self.embedding_model_url = embedding_model_url or f"{base}/api/embeddings"
         self.model_name = model_name or os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+        # Shared pooled client; the base URL is everything before /api/
+        self.embedder = shared_client(self.embedding_model_url.split("/api/")[0], self.model_name)
         self.index = None
         self.data: List[MemoryItem] = []
         self.embeddings: List[np.ndarray] = []
 
     def _get_embedding(self, text: str) -> np.ndarray:
-        response = requests.post(
-            self.embedding_model_url,
-            json={"model": self.model_name, "prompt": text}
-        )
-        response.raise_for_status()
-        return np.array(response.json()["embedding"], dtype=np.float32)
+        return self.embedder.embed(text)
 
     def add(self, item: MemoryItem):
         emb = self._get_embedding(item.text)
@@ -86,5 +83,12 @@ class MemoryManager:
         return results
 
     def bulk_add(self, items: List[MemoryItem]):
-        for item in items:
-            self.add(item)
+        if not items:
+            return
+        embs = self.embedder.embed_many([item.text for item in items])
+        self.embeddings.extend(embs)
+        self.data.extend(items)
+
+        if self.index is None:
+            self.index = faiss.IndexFlatL2(embs.shape[1])
+        self.index.add(embs)
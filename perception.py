@@ -1,10 +1,8 @@
 from pydantic import BaseModel
 from typing import Optional, List
-import os
-from dotenv import load_dotenv
-from openai import OpenAI  # fallback if get_secret is unavailable
 import re
 from typing import Dict
+from llm_client import client, get_async_client, llm_model
 
 # Optional: import log from agent if shared, else define locally
 try:
@@ -15,17 +13,6 @@ except ImportError:
         now = datetime.datetime.now().strftime("%H:%M:%S")
         print(f"[{now}] [{stage}] {msg}")
 
-load_dotenv()
-
-# Initialize OpenAI client via external get_secret if available
-try:
-    import sys as _sys
-    _sys.path.append("/home/ubuntu/ios_backend")
-    from bk_ask.config import get_secret as _get_secret
-    client = _get_secret()
-except Exception:
-    client = OpenAI()
-
 # Lightweight intent patterns (regex)
 INTENT_PATTERNS: Dict[str, list[str]] = {
     'numerical_range': [
@@ -56,16 +43,8 @@ def _rule_based_intent(text: str) -> Optional[str]:
     return None
 
 
-def extract_perception(user_input: str) -> PerceptionResult:
-    """Extracts intent, entities, and tool hints using rules with LLM fallback."""
-
-    # 1) Rule-based intent first
-    intent = _rule_based_intent(user_input)
-    if intent:
-        return PerceptionResult(user_input=user_input, intent=intent, entities=[], tool_hint=None)
-
-    # 2) Fallback to LLM if rules don't catch it
-    prompt = f"""
+def _perception_prompt(user_input: str) -> str:
+    return f"""
 You are an AI that extracts structured facts from user input.
 
 Input: "{user_input}"
@@ -78,22 +57,55 @@ Return the response as a Python dictionary with keys:
 Output only the dictionary on a single line. Do NOT wrap it in ```json or other formatting. Ensure `entities` is a list of strings, not a dictionary.
     """
 
+
+def _parse_perception(user_input: str, raw: str) -> PerceptionResult:
+    clean = re.sub(r"^```json|```$", "", raw.strip(), flags=re.MULTILINE).strip()
+    try:
+        parsed = eval(clean)
+    except Exception as e:
+        log("perception", f"Failed to parse cleaned output: {e}")
+        raise
+    if isinstance(parsed.get("entities"), dict):
+        parsed["entities"] = list(parsed["entities"].values())
+    return PerceptionResult(user_input=user_input, **parsed)
+
+
+def extract_perception(user_input: str) -> PerceptionResult:
+    """Extracts intent, entities, and tool hints using rules with LLM fallback."""
+
+    # 1) Rule-based intent first
+    intent = _rule_based_intent(user_input)
+    if intent:
+        return PerceptionResult(user_input=user_input, intent=intent, entities=[], tool_hint=None)
+
+    # 2) Fallback to LLM if rules don't catch it
     try:
         response = client.chat.completions.create(
-            model=os.getenv("OPENAI_LLM_MODEL", "gpt-4o-mini"),
-            messages=[{"role": "user", "content": prompt}],
+            model=llm_model(),
+            messages=[{"role": "user", "content": _perception_prompt(user_input)}],
+            temperature=0.2,
+        )
+        raw = (response.choices[0].message.content or "").strip()
+        return _parse_perception(user_input, raw)
+    except Exception as e:
+        log("perception", f"Extraction failed: {e}")
+        return PerceptionResult(user_input=user_input)
+
+
+async def extract_perception_async(user_input: str) -> PerceptionResult:
+    """Same as extract_perception, but awaits the LLM fallback instead of blocking the event loop."""
+    intent = _rule_based_intent(user_input)
+    if intent:
+        return PerceptionResult(user_input=user_input, intent=intent, entities=[], tool_hint=None)
+
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=llm_model(),
+            messages=[{"role": "user", "content": _perception_prompt(user_input)}],
             temperature=0.2,
         )
         raw = (response.choices[0].message.content or "").strip()
-        clean = re.sub(r"^```json|```$", "", raw.strip(), flags=re.MULTILINE).strip()
-        try:
-            parsed = eval(clean)
-        except Exception as e:
-            log("perception", f"Failed to parse cleaned output: {e}")
-            raise
-        if isinstance(parsed.get("entities"), dict):
-            parsed["entities"] = list(parsed["entities"].values())
-        return PerceptionResult(user_input=user_input, **parsed)
+        return _parse_perception(user_input, raw)
     except Exception as e:
         log("perception", f"Extraction failed: {e}")
         return PerceptionResult(user_input=user_input)
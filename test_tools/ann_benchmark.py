@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Recall-vs-latency report for approximate FAISS index types.
+
+Builds HNSW and IVF-Flat indexes over the current knowledge base with a
+grid of settings and compares their top-k results and query latency
+against the exact flat index, to help choose RAGConfig index settings.
+Queries are embedded questions, by default a built-in baby care set.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+# Add parent directory to path to import babycare_rag
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from babycare_rag import RAGConfig
+from babycare_rag.search_engine import SearchEngine
+from babycare_rag.vector_index import build_index, chunk_text
+from rich.console import Console
+from rich.table import Table
+import argparse
+
+DEFAULT_QUESTIONS = [
+    "What temperature should a baby's room be?",
+    "What is the ideal temperature for baby to sleep in celsius?",
+    "How often should I feed my newborn?",
+    "What should I do if my baby won't stop crying?",
+    "Is it safe to use a blanket for a 3-month-old baby?",
+    "My baby has a fever, what should I do?",
+    "What is the weight limit for baby bath tub sling?",
+    "When do I switch baby from infant car seat to booster seat?",
+    "How do I know if my baby is getting enough breast milk?",
+    "When should my baby start eating solid food?",
+    "How many hours a day should a newborn sleep?",
+    "How do I bathe a newborn safely?",
+    "What should I do in case of labour pain?",
+    "How can I soothe a teething baby?",
+    "When should I call a doctor about diaper rash?",
+]
+
+
+def load_vectors(engine: SearchEngine) -> np.ndarray:
+    """Embeddings of every chunk (served from the embedding cache when possible)."""
+    chunks = (engine.metadata or {}).get('chunks', [])
+    if not chunks:
+        raise SystemExit("No chunks in the knowledge base. Add documents first.")
+    return engine.embed_texts([chunk_text(chunk) for chunk in chunks])
+
+
+def load_questions(path: str = None):
+    """Questions from a file (one per line), or the built-in set."""
+    if not path:
+        return DEFAULT_QUESTIONS
+    with open(path, 'r', encoding='utf-8') as f:
+        questions = [line.strip() for line in f if line.strip()]
+    if not questions:
+        raise SystemExit(f"No questions in {path}")
+    return questions
+
+
+def timed_search(index, queries: np.ndarray, top_k: int):
+    """Return (ids, mean milliseconds per query), searching one query at a time."""
+    ids = np.empty((len(queries), top_k), dtype=np.int64)
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        _, found = index.search(query.reshape(1, -1), top_k)
+        ids[i] = found[0]
+    elapsed = time.perf_counter() - start
+    return ids, 1000.0 * elapsed / len(queries)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t[t >= 0])) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def candidate_settings(config: RAGConfig, num_vectors: int):
+    """Grid of index settings to compare with the flat index."""
+    for m in (16, 32, 48):
+        for ef_search in (16, 32, 64, 128, 256):
+            yield config.model_copy(update={
+                "index_type": "hnsw", "hnsw_m": m, "hnsw_ef_search": ef_search
+            })
+
+    base_nlist = max(1, int(4 * np.sqrt(num_vectors)))
+    for nlist in sorted({max(1, base_nlist // 2), base_nlist, base_nlist * 2}):
+        for nprobe in (1, 4, 8, 16, 32):
+            if nprobe <= nlist:
+                yield config.model_copy(update={
+                    "index_type": "ivf_flat", "ivf_nlist": nlist, "ivf_nprobe": nprobe
+                })
+
+
+def describe(config: RAGConfig, index) -> str:
+    if config.index_type == "hnsw":
+        return f"M={config.hnsw_m}, efSearch={config.hnsw_ef_search}"
+    if config.index_type == "ivf_flat":
+        # nlist may have been capped by the corpus size
+        nlist = faiss.downcast_index(index.index).nlist
+        return f"nlist={nlist}, nprobe={config.ivf_nprobe}"
+    return "exact"
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="BabyCare RAG ANN Recall/Latency Report")
+    parser.add_argument("--questions", help="File with one question per line (default: built-in set)")
+    parser.add_argument("--top-k", type=int, default=20, help="Neighbours compared per query")
+
+    args = parser.parse_args()
+    console = Console()
+
+    config = RAGConfig.from_env()
+    engine = SearchEngine(config)
+    vectors = load_vectors(engine)
+    ids = np.arange(len(vectors), dtype=np.int64)
+    top_k = min(args.top_k, len(vectors))
+
+    # Real questions, embedded like search queries
+    queries = np.vstack(engine.embedder.embed_many(load_questions(args.questions)))
+
+    flat = build_index(vectors.shape[1], config.model_copy(update={"index_type": "flat"}))
+    flat.add_with_ids(vectors, ids)
+    truth, flat_ms = timed_search(flat, queries, top_k)
+
+    table = Table(title=f"Recall@{top_k} vs flat over {len(vectors)} vectors, {len(queries)} queries")
+    table.add_column("Index", style="cyan")
+    table.add_column("Settings")
+    table.add_column("Build (s)", justify="right")
+    table.add_column(f"Recall@{top_k}", justify="right")
+    table.add_column("ms / query", justify="right")
+    table.add_column("Speed-up", justify="right")
+    table.add_row("flat", "exact", "-", "1.000", f"{flat_ms:.3f}", "1.0x")
+
+    for candidate in candidate_settings(config, len(vectors)):
+        start = time.perf_counter()
+        index = build_index(vectors.shape[1], candidate, train_vectors=vectors)
+        index.add_with_ids(vectors, ids)
+        build_s = time.perf_counter() - start
+
+        found, ms = timed_search(index, queries, top_k)
+        table.add_row(
+            candidate.index_type,
+            describe(candidate, index),
+            f"{build_s:.2f}",
+            f"{recall_at_k(found, truth):.3f}",
+            f"{ms:.3f}",
+            f"{flat_ms / ms:.1f}x" if ms else "-"
+        )
+
+    console.print(table)
+    console.print("Set the chosen values on RAGConfig (index_type, hnsw_*, ivf_*) and run rebuild_index().")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Shared fixtures: a deterministic embedder and throwaway index directories."""
+
+import hashlib
+
+import numpy as np
+import pytest
+
+from babycare_rag import search_engine
+from babycare_rag.config import RAGConfig
+
+DIM = 16
+
+
+def fake_vector(text: str) -> np.ndarray:
+    """Unit vector derived from the text, stable across calls and processes."""
+    seed = int.from_bytes(hashlib.md5(text.encode()).digest()[:4], "little")
+    vector = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeEmbedder:
+    """Stands in for the Ollama client and counts the texts it embeds."""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed(self, text: str) -> np.ndarray:
+        self.embedded += 1
+        return fake_vector(text)
+
+    def embed_many(self, texts) -> np.ndarray:
+        self.embedded += len(texts)
+        return np.vstack([fake_vector(text) for text in texts])
+
+
+@pytest.fixture
+def embedder(monkeypatch) -> FakeEmbedder:
+    fake = FakeEmbedder()
+    monkeypatch.setattr(search_engine, "shared_client", lambda *args, **kwargs: fake)
+    return fake
+
+
+@pytest.fixture
+def config(tmp_path) -> RAGConfig:
+    return RAGConfig(
+        documents_dir=str(tmp_path / "documents"),
+        index_dir=str(tmp_path / "faiss_index"),
+        delta_max_chunks=4,
+        delta_max_ratio=0.0
+    )
@@ -0,0 +1,65 @@
+"""iter_chunks against the character splitter DocumentProcessor used before it."""
+
+import random
+
+import pytest
+
+from babycare_rag.chunking import iter_chunks
+
+
+def old_chunks(content: str, chunk_size: int = 1000, overlap: int = 200):
+    """The former DocumentProcessor._chunk_document, as (text, start, end)."""
+    chunks = []
+    start = 0
+    while start < len(content):
+        end = start + chunk_size
+        if end < len(content):
+            # Look for sentence endings within the last 100 characters
+            search_start = max(start, end - 100)
+            sentence_end = -1
+            for i in range(end, search_start, -1):
+                if content[i] in '.!?':
+                    sentence_end = i + 1
+                    break
+            if sentence_end > 0:
+                end = sentence_end
+        chunk_text = content[start:end].strip()
+        if chunk_text:
+            chunks.append((chunk_text, start, end))
+        start = end - overlap if end < len(content) else end
+    return chunks
+
+
+def random_text(seed: int, sentences: int) -> str:
+    rng = random.Random(seed)
+    words = ["baby", "sleep", "feeding", "room", "temperature", "nap", "bottle", "diaper", "a", "the"]
+    parts = []
+    for _ in range(sentences):
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(1, 40)))
+        parts.append(sentence + rng.choice([".", "!", "?", ",", ""]))
+        parts.append(rng.choice([" ", "  ", "\n", "\n\n"]))
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_char_chunks_match_the_old_splitter(seed):
+    text = random_text(seed, sentences=random.Random(seed).randint(0, 400))
+    assert [tuple(chunk) for chunk in iter_chunks(text, 1000, 200)] == old_chunks(text)
+
+
+def test_text_without_sentence_ends_matches_the_old_splitter():
+    text = "word " * 2000
+    assert [tuple(chunk) for chunk in iter_chunks(text, 1000, 200)] == old_chunks(text)
+
+
+@pytest.mark.parametrize("unit", ["word", "token"])
+def test_unit_chunks_cover_the_text_within_budget(unit):
+    text = random_text(7, sentences=300)
+    chunks = list(iter_chunks(text, 50, 10, unit=unit))
+    assert chunks[0].start == 0 and chunks[-1].end == len(text.rstrip())
+    assert all(b.start < a.end for a, b in zip(chunks, chunks[1:]))
+    assert all(a.start < b.start for a, b in zip(chunks, chunks[1:]))
+
+
+def test_chunker_always_advances_when_overlap_exceeds_size():
+    assert len(list(iter_chunks("a. " * 50, 5, 10))) < 150
@@ -0,0 +1,85 @@
+"""Document ids and titles across IngestPipeline.sync."""
+
+from pathlib import Path
+
+import pytest
+
+from babycare_rag.config import RAGConfig
+from babycare_rag.document_processor import DocumentProcessor
+from babycare_rag.ingest import IngestPipeline
+from babycare_rag.metadata_store import legacy_doc_id
+from babycare_rag.search_engine import SearchEngine
+
+TEXT = "Babies sleep for most of the day. Naps get shorter as they grow. " * 20
+
+
+@pytest.fixture
+def server_config(tmp_path, monkeypatch) -> RAGConfig:
+    """The MCP server's configuration: absolute directories, word chunks."""
+    monkeypatch.chdir(tmp_path)
+    return RAGConfig(
+        documents_dir=str(tmp_path / "documents"),
+        index_dir=str(tmp_path / "faiss_index"),
+        chunk_size=256,
+        chunk_overlap=40,
+        chunk_unit="word",
+        ingest_workers=1
+    )
+
+
+def sync(config: RAGConfig):
+    engine = SearchEngine(config)
+    pipeline = IngestPipeline(DocumentProcessor(config, store=engine.store), engine)
+    report = pipeline.sync(Path(config.documents_dir), Path(config.index_dir) / "doc_index_cache.json")
+    return report, engine.store
+
+
+def test_doc_ids_do_not_depend_on_how_documents_dir_is_given(server_config):
+    relative = DocumentProcessor(RAGConfig(documents_dir="documents", index_dir="faiss_index"))
+    path = Path(server_config.documents_dir) / "guide.txt"
+    absolute = DocumentProcessor(server_config)
+
+    assert relative.doc_id_for(Path("documents/guide.txt")) == absolute.doc_id_for(path)
+
+
+def test_sync_keeps_documents_added_by_another_process(server_config, embedder):
+    processor = DocumentProcessor(RAGConfig(documents_dir="documents", index_dir="faiss_index"))
+    [added] = processor.add_documents_from_texts([{'text': TEXT, 'title': "Sleep Guide"}])
+
+    report, store = sync(server_config)
+
+    assert report.documents_processed == 0
+    assert [(doc['doc_id'], doc['title']) for doc in store.list_documents()] == [(added.doc_id, "Sleep Guide")]
+    assert store.get_document(added.doc_id)['chunk_count'] == added.chunk_count
+
+
+def test_changed_documents_keep_their_title(server_config, embedder):
+    processor = DocumentProcessor(RAGConfig(documents_dir="documents", index_dir="faiss_index"))
+    [added] = processor.add_documents_from_texts([{'text': TEXT, 'title': "Sleep Guide"}])
+    sync(server_config)
+
+    file = next(Path(server_config.documents_dir).glob("*.txt"))
+    file.write_text("Feeding every three hours is common. " * 30)
+    report, store = sync(server_config)
+
+    assert report.documents_processed == 1
+    assert [(doc['doc_id'], doc['title']) for doc in store.list_documents()] == [(added.doc_id, "Sleep Guide")]
+
+
+def test_sync_replaces_only_legacy_documents(server_config, embedder):
+    documents = Path(server_config.documents_dir)
+    documents.mkdir()
+    (documents / "guide.txt").write_text(TEXT)
+    store = SearchEngine(server_config).store
+    for doc_id in (legacy_doc_id("guide.txt"), "imported-elsewhere"):
+        store.add_document(
+            {'doc_id': doc_id, 'title': doc_id, 'file_path': str(documents / "guide.txt"),
+             'added_date': "0", 'chunk_count': 1},
+            [{'id': f"{doc_id}_0", 'doc_id': doc_id, 'chunk_id': 0, 'text': "old text"}]
+        )
+
+    report, store = sync(server_config)
+
+    doc_id = DocumentProcessor(server_config).doc_id_for(documents / "guide.txt")
+    assert report.documents_processed == 1
+    assert sorted(doc['doc_id'] for doc in store.list_documents()) == sorted([doc_id, "imported-elsewhere"])
@@ -0,0 +1,102 @@
+"""Delta updates versus compaction in SearchEngine.update_index."""
+
+from babycare_rag.metadata_store import MetadataStore
+from babycare_rag.search_engine import SearchEngine
+
+
+def add_document(store: MetadataStore, doc_id: str, count: int):
+    chunks = [
+        {'id': f"{doc_id}_{i}", 'doc_id': doc_id, 'chunk_id': i, 'text': f"{doc_id} chunk number {i}"}
+        for i in range(count)
+    ]
+    store.add_document(
+        {'doc_id': doc_id, 'title': doc_id, 'file_path': f"documents/{doc_id}.txt",
+         'added_date': "0", 'chunk_count': count},
+        chunks
+    )
+
+
+def make_engine(config, embedder, *documents) -> SearchEngine:
+    engine = SearchEngine(config)
+    for doc_id, count in documents:
+        add_document(engine.store, doc_id, count)
+    assert engine.update_index()
+    embedder.embedded = 0
+    return engine
+
+
+def count_embedded_texts(engine: SearchEngine) -> list:
+    """Record the number of texts of every embed_texts call, cached or not."""
+    calls = []
+    embed_texts = engine.embed_texts
+
+    def counting(texts):
+        calls.append(len(texts))
+        return embed_texts(texts)
+
+    engine.embed_texts = counting
+    return calls
+
+
+def test_changes_within_the_limit_become_a_delta(config, embedder):
+    engine = make_engine(config, embedder, ("alpha", 3), ("beta", 3))
+    generation = engine.generation
+
+    add_document(engine.store, "gamma", config.delta_max_chunks)
+    assert engine.update_index()
+
+    assert engine.generation == generation
+    assert engine._snapshot.delta.size == config.delta_max_chunks
+    assert embedder.embedded == config.delta_max_chunks
+    assert engine.search("gamma chunk number 1", 1)[0].chunk_id == "gamma_1"
+
+
+def test_changes_over_the_limit_are_compacted_without_a_delta(config, embedder):
+    config.embed_batch_size, config.embed_concurrency = 2, 1
+    engine = make_engine(config, embedder, ("alpha", 3), ("beta", 3))
+    generation = engine.generation
+    calls = count_embedded_texts(engine)
+
+    add_document(engine.store, "gamma", config.delta_max_chunks + 1)
+    assert engine.update_index()
+
+    assert engine.generation == generation + 1
+    assert engine._snapshot.delta is None
+    # Each new chunk is embedded once, by the compaction only, one batch at a time
+    assert sum(calls) == config.delta_max_chunks + 1
+    assert max(calls) <= config.embed_batch_size * config.embed_concurrency
+    assert embedder.embedded == config.delta_max_chunks + 1
+    assert engine.faiss_index.ntotal == 3 + 3 + config.delta_max_chunks + 1
+
+
+def test_hidden_base_chunks_count_towards_the_limit(config, embedder):
+    engine = make_engine(config, embedder, ("alpha", 3), ("beta", 2))
+    generation = engine.generation
+
+    # Three chunks hidden plus two added is over the limit of four
+    add_document(engine.store, "alpha", 2)
+    assert engine.update_index()
+
+    assert engine.generation == generation + 1
+    assert sorted(result.chunk_id for result in engine.search("alpha chunk number", 10)
+                  if result.chunk_id.startswith("alpha")) == ["alpha_0", "alpha_1"]
+
+
+def test_removed_documents_disappear_from_delta_searches(config, embedder):
+    engine = make_engine(config, embedder, ("alpha", 2), ("beta", 2))
+
+    engine.store.remove_document("alpha")
+    assert engine.update_index()
+
+    assert engine._snapshot.delta.size == 2
+    assert all(result.chunk_id.startswith("beta") for result in engine.search("alpha chunk number 0", 5))
+
+
+def test_another_engine_picks_up_the_delta(config, embedder):
+    writer = make_engine(config, embedder, ("alpha", 3), ("beta", 3))
+    reader = SearchEngine(config)
+
+    add_document(writer.store, "gamma", 2)
+    assert writer.update_index()
+
+    assert reader.search("gamma chunk number 0", 1)[0].chunk_id == "gamma_0"